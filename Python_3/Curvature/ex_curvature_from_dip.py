@@ -3,7 +3,6 @@
 #
 import sys,os
 import numpy as np
-from numba import autojit
 #
 # Import the module with the I/O scaffolding of the External Attribute
 #
@@ -36,15 +35,9 @@ def doCompute():
 		W = np.ones(U.shape)
 #
 #	Calculate the derivatives of the components and some intermediate results
-		ux = xl.kroon3( U, axis=0 )[hxs,hys,:]
-		uy = xl.kroon3( U, axis=1 )[hxs,hys,:]
-		uz = xl.kroon3( U, axis=2 )[hxs,hys,:]
-		vx = xl.kroon3( V, axis=0 )[hxs,hys,:]
-		vy = xl.kroon3( V, axis=1 )[hxs,hys,:]
-		vz = xl.kroon3( V, axis=2 )[hxs,hys,:]
-		wx = xl.kroon3( W, axis=0 )[hxs,hys,:]
-		wy = xl.kroon3( W, axis=1 )[hxs,hys,:]
-		wz = xl.kroon3( W, axis=2 )[hxs,hys,:]
+		ux, uy, uz = xl.gradient3( U, full=False )
+		vx, vy, vz = xl.gradient3( V, full=False )
+		wx, wy, wz = xl.gradient3( W, full=False )
 		u = U[hxs,hys,:]
 		v = V[hxs,hys,:]
 		w = W[hxs,hys,:]
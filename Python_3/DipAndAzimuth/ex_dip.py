@@ -16,6 +16,7 @@ import extattrib as xa
 xa.params = {
 	'Inputs': ['Crl_dip', 'Inl_dip'],
 	'Output': ['True Dip', 'Dip Azimuth'],
+	'Batch': 256,
 	'Help': 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/DipandAzimuth.html'
 }
 #
@@ -25,13 +26,13 @@ def doCompute():
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	while True:
-		xa.doInput()
+		xa.doBatchInput()
 
 #
 #	Get the output
 		xa.Output['True Dip'] = np.sqrt(xa.Input['Crl_dip']*xa.Input['Crl_dip']+xa.Input['Inl_dip']*xa.Input['Inl_dip'])
 		xa.Output['Dip Azimuth'] = np.degrees(np.arctan2(xa.Input['Inl_dip'],xa.Input['Crl_dip']))
-		xa.doOutput()
+		xa.doBatchOutput()
 #
 # Assign the compute function to the attribute
 #
@@ -22,19 +22,18 @@ xa.params = {
 	'Par_0' : {'Name': 'Band', 'Value': 0.9},
 	'StepOut' : {'Value': [1,1], 'Hidden': True},
 	'Parallel': True,
+	'Prefetch': True,
 	'Help': 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/DipandAzimuth.html'
 }
 #
 # Define the compute function
 #
 def doCompute():
-	hxs = xa.SI['nrinl']//2
-	hys = xa.SI['nrcrl']//2
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	band = xa.params['Par_0']['Value']
 	N = xa.params['ZSampMargin']['Value'][1]
-	kernel = xl.hilbert_kernel(N, band)
+	ansigCache = xa.ColumnCache(lambda trcs: xl.analytic_signal(trcs, N, band), vectorised=True)
 	while True:
 		xa.doInput()
 
@@ -42,21 +41,10 @@ def doCompute():
 #
 #	Analytic Signal
 #
-		ansig = np.apply_along_axis(np.convolve,-1, indata, kernel, mode="same")
-		sr = np.real(ansig)
-		si = np.imag(ansig)
-#
-#	Compute partial derivatives
-		sx = xl.kroon3( sr, axis=0 )[hxs,hys,:]
-		sy = xl.kroon3( sr, axis=1 )[hxs,hys,:]
-		sz = xl.kroon3( sr, axis=2 )[hxs,hys,:]
-		shx = xl.kroon3( si, axis=0 )[hxs,hys,:]
-		shy = xl.kroon3( si, axis=1 )[hxs,hys,:]
-		shz = xl.kroon3( si, axis=2 )[hxs,hys,:]
-		
-		px = sr[hxs,hys,:] * shx - si[hxs,hys,:] * sx 
-		py = sr[hxs,hys,:] * shy - si[hxs,hys,:] * sy 
-		pz = sr[hxs,hys,:] * shz - si[hxs,hys,:] * sz 
+		ansig = ansigCache.block(indata)
+#
+#	Compute the instantaneous wavenumber at the centre trace
+		px, py, pz = xl.wavenumber3( ansig, full=False )
 #
 #	Calculate dips and output
 		xa.Output['Crl_dip'] = -py/pz*crlFactor
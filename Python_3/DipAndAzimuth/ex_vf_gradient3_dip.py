@@ -5,7 +5,6 @@
 #
 import sys,os
 import numpy as np
-from numba import autojit
 #
 # Import the module with the I/O scaffolding of the External Attribute
 #
@@ -21,6 +20,7 @@ xa.params = {
 	'ZSampMargin' : {'Value':[-2,2], 'Minimum':[-2,2], 'Symmetric': True},
 	'StepOut' : {'Value': [2,2], 'Minimum': [2,2]},
 	'Select': {'Name': 'Filter', 'Values': ['Mean Dip', 'Vector L1 Median Dip', 'Vector L2 Median Dip', 'Vector X3 Median'], 'Selection': 0},
+	'Prefetch': True,
 	'Help': 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/DipandAzimuth.html'
 }
 #
@@ -32,7 +32,7 @@ def doCompute():
 	zs = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
 	zw = zs-2
 	filt = xa.params['Select']['Selection']
-	filtFunc = autojit(xl.vecmean) if filt==0 else  autojit(xl.vmf_l1) if filt==1 else autojit(xl.vmf_l2) if filt==2 else autojit(xl.vmf_x3)
+	filtFunc = ['mean', 'l1', 'l2', 'x3'][filt]
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	while True:
@@ -41,9 +41,7 @@ def doCompute():
 		p = xa.Input['Input']
 #
 #	Compute partial derivatives
-		px = xl.kroon3( p, axis=0 )[1:xs-1,1:ys-1,:]
-		py = xl.kroon3( p, axis=1 )[1:xs-1,1:ys-1,:]
-		pz = xl.kroon3( p, axis=2 )[1:xs-1,1:ys-1,:]
+		px, py, pz = xl.gradient3( p, full=False, size=(xs-2, ys-2) )
 #
 #	Normalise the gradients so Z component is positive
 		p = np.sign(pz)/np.sqrt(px*px+py*py+pz*pz)
@@ -6,7 +6,6 @@
 import sys,os
 import numpy as np
 from scipy.signal import hilbert
-from numba import autojit
 
 #
 # Import the module with the I/O scaffolding of the External Attribute
@@ -26,6 +25,7 @@ xa.params = {
 	'Par_0' : {'Name': 'Vector Filter ZStepOut', 'Value': 1},
 	'Par_1' : {'Name': 'Band', 'Value': 0.9},
 	'Select': {'Name': 'Filter', 'Values': ['Mean Dip', 'Vector L1 Median Dip', 'Vector L2 Median Dip'], 'Selection': 0},
+	'Prefetch': True,
 	'Help': 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/DipandAzimuth.html'
 }
 #
@@ -36,13 +36,13 @@ def doCompute():
 	ys = xa.SI['nrcrl']
 	zs = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
 	filt = xa.params['Select']['Selection']
-	filtFunc = autojit(xl.vecmean) if filt==0 else  autojit(xl.vmf_l1) if filt==1 else autojit(xl.vmf_l2)
+	filtFunc = ['mean', 'l1', 'l2'][filt]
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	band = xa.params['Par_1']['Value']
 	zw = min(2*int(xa.params['Par_0']['Value'])+1,3)
 	N = xa.params['ZSampMargin']['Value'][1]
-	kernel = xl.hilbert_kernel(N, band)
+	ansigCache = xa.ColumnCache(lambda trcs: xl.analytic_signal(trcs, N, band), vectorised=True)
 	while True:
 		xa.doInput()
 
@@ -50,21 +50,10 @@ def doCompute():
 #
 #	Analytic Signal
 #
-		ansig = np.apply_along_axis(np.convolve,-1, indata, kernel, mode="same")
-		sr = np.real(ansig)
-		si = np.imag(ansig)
-#
-#	Compute partial derivatives
-		sx = xl.kroon3( sr, axis=0 )
-		sy = xl.kroon3( sr, axis=1 )
-		sz = xl.kroon3( sr, axis=2 )
-		shx = xl.kroon3( si, axis=0 )
-		shy = xl.kroon3( si, axis=1 )
-		shz = xl.kroon3( si, axis=2 )
-		
-		px = sr[1:xs-1,1:ys-1,:] * shx[1:xs-1,1:ys-1,:] - si[1:xs-1,1:ys-1,:] * sx[1:xs-1,1:ys-1,:]
-		py = sr[1:xs-1,1:ys-1,:] * shy[1:xs-1,1:ys-1,:] - si[1:xs-1,1:ys-1,:] * sy[1:xs-1,1:ys-1,:]
-		pz = sr[1:xs-1,1:ys-1,:] * shz[1:xs-1,1:ys-1,:] - si[1:xs-1,1:ys-1,:] * sz[1:xs-1,1:ys-1,:]
+		ansig = ansigCache.block(indata)
+#
+#	Compute the instantaneous wavenumber
+		px, py, pz = xl.wavenumber3( ansig, full=False, size=(xs-2, ys-2) )
 #
 #	Normalise the gradients so Z component is positive
 		p = np.sign(pz)/np.sqrt(px*px+py*py+pz*pz)
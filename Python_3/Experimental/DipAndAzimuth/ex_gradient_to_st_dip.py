@@ -27,7 +27,7 @@ def doCompute():
 	xs = xa.SI['nrinl']
 	ys = xa.SI['nrcrl']
 	zs = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
-	kernel = xl.getGaussian(xs, ys, zs)
+	weights = xl.getGaussianWeights(xs, ys, zs)
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	while True:
@@ -37,21 +37,11 @@ def doCompute():
 		gy = xa.Input['Cross-line gradient']
 		gz = xa.Input['Z gradient']
 #
-#	Inner product of  gradients
-		gx2 = gx * gx
-		gy2 = gy * gy
-		gz2 = gz * gz
-		gxgy = gx * gy
-		gxgz = gx * gz
-		gygz = gy * gz
+#	Inner product of gradients stacked for smoothing
+		products = np.array([gx*gx, gy*gy, gz*gz, gx*gy, gx*gz, gy*gz])
 #
 #	Outer gaussian smoothing
-		rgx2 = xl.sconvolve(gx2, kernel)
-		rgy2 = xl.sconvolve(gy2, kernel)
-		rgz2 = xl.sconvolve(gz2, kernel)
-		rgxgy = xl.sconvolve(gxgy, kernel)
-		rgxgz = xl.sconvolve(gxgz, kernel)
-		rgygz = xl.sconvolve(gygz, kernel)
+		rgx2, rgy2, rgz2, rgxgy, rgxgz, rgygz = xl.separable_sconvolve(products, weights)
 #
 #	Form the structure tensor
 		T = np.rollaxis(np.array([	[rgx2,  rgxgy, rgxgz],
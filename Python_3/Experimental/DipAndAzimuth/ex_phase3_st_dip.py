@@ -31,7 +31,7 @@ def doCompute():
 	xs = xa.SI['nrinl']
 	ys = xa.SI['nrcrl']
 	zs = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
-	kernel = xl.getGaussian(xs-2, ys-2, zs-2)
+	weights = xl.getGaussianWeights(xs-2, ys-2, zs-2)
 	hxs = xs//2
 	hys = ys//2
 	inlFactor = xa.SI['zstep']/xa.SI['inldist'] * xa.SI['dipFactor']
@@ -42,34 +42,26 @@ def doCompute():
 		s = xa.Input['Input']
 		sh = np.imag( hilbert(s) ) 
 #
-#	Compute partial derivatives
-		sx = xl.kroon3( s, axis=0 )
-		sy = xl.kroon3( s, axis=1 )
-		sz = xl.kroon3( s, axis=2 )
-		shx = xl.kroon3( sh, axis=0 )
-		shy = xl.kroon3( sh, axis=1 )
-		shz = xl.kroon3( sh, axis=2 )
+#	Compute partial derivatives for the traces free of boundary effects
+		sx = xl.kroon3( s, axis=0, mode='valid' )
+		sy = xl.kroon3( s, axis=1, mode='valid' )
+		sz = xl.kroon3( s, axis=2, mode='valid' )
+		shx = xl.kroon3( sh, axis=0, mode='valid' )
+		shy = xl.kroon3( sh, axis=1, mode='valid' )
+		shz = xl.kroon3( sh, axis=2, mode='valid' )
+		s = s[1:xs-1,1:ys-1,:]
+		sh = sh[1:xs-1,1:ys-1,:]
 		
-		a = s[1:xs-1,1:ys-1,:]*s[1:xs-1,1:ys-1,:] + sh[1:xs-1,1:ys-1,:]*sh[1:xs-1,1:ys-1,:]
-		px = (s[1:xs-1,1:ys-1,:] * shx[1:xs-1,1:ys-1,:] - sh[1:xs-1,1:ys-1,:] * sx[1:xs-1,1:ys-1,:])/a
-		py = (s[1:xs-1,1:ys-1,:] * shy[1:xs-1,1:ys-1,:] - sh[1:xs-1,1:ys-1,:] * sy[1:xs-1,1:ys-1,:])/a
-		pz = (s[1:xs-1,1:ys-1,:] * shz[1:xs-1,1:ys-1,:] - sh[1:xs-1,1:ys-1,:] * sz[1:xs-1,1:ys-1,:])/a
-#
-#	Inner product of gradients
-		px2 = px * px
-		py2 = py * py
-		pz2 = pz * pz
-		pxpy = px * py
-		pxpz = px * pz
-		pypz = py * pz
+		a = s*s + sh*sh
+		px = (s * shx - sh * sx)/a
+		py = (s * shy - sh * sy)/a
+		pz = (s * shz - sh * sz)/a
+#
+#	Inner product of gradients stacked for smoothing
+		products = np.array([px*px, py*py, pz*pz, px*py, px*pz, py*pz])
 #
 # Outer smoothing
-		rgx2 = xl.sconvolve(px2, kernel)
-		rgy2 = xl.sconvolve(py2, kernel)
-		rgz2 = xl.sconvolve(pz2, kernel)
-		rgxgy = xl.sconvolve(pxpy, kernel)
-		rgxgz = xl.sconvolve(pxpz, kernel)
-		rgygz = xl.sconvolve(pypz, kernel)
+		rgx2, rgy2, rgz2, rgxgy, rgxgz, rgygz = xl.separable_sconvolve(products, weights)
 #
 #	Form the structure tensor
 		T = np.rollaxis(np.array([	[rgx2,  rgxgy, rgxgz],
@@ -36,7 +36,7 @@ def doCompute():
 	while True:
 		xa.doInput()
 		for i in range(0,10):
-			xa.Output['r'+str(i)] = xl.sconvolve(xa.Input,kernel[i])
+			xl.sconvolve(xa.Input, kernel[i], output=xa.Output['r'+str(i)])
 		xa.doOutput()
 	
 #
@@ -45,7 +45,7 @@ def doCompute():
 		xa.doInput()
 		r = np.zeros((10,xa.TI['nrsamp']))
 		for i in range(0,10):
-			r[i,:] = xl.sconvolve(xa.Input,kernel[i])
+			xl.sconvolve(xa.Input, kernel[i], output=r[i])
 		A = np.rollaxis(np.array([[r[4],r[7]/2, r[8]/2], [r[7]/2, r[5], r[9]/2], [r[8]/2, r[9]/2, r[6]]]),2)
 		AAT = np.einsum('...ij,...jk->...ik', A, np.swapaxes(A,1,2))
 		B = np.rollaxis(np.array([[r[1]],[r[2]],[r[3]]]),2)
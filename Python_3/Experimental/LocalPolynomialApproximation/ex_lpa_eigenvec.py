@@ -38,22 +38,19 @@ def doCompute():
 		xa.doInput()
 		r = np.zeros((10,xa.TI['nrsamp']))
 		for i in range(0,10):
-			r[i,:] = xl.sconvolve(xa.Input,kernel[i])
+			xl.sconvolve(xa.Input, kernel[i], output=r[i])
 		A = np.rollaxis(np.array([[r[4],r[7]/2, r[8]/2], [r[7]/2, r[5], r[9]/2], [r[8]/2, r[9]/2, r[6]]]),2)
 		AAT = np.einsum('...ij,...jk->...ik', A, np.swapaxes(A,1,2))
 		B = np.rollaxis(np.array([[r[1]],[r[2]],[r[3]]]),2)
 		BBT = np.einsum('...ij,...jk->...ik', B, np.swapaxes(B,1,2))
 		T = AAT+gam*BBT
 		p = np.rollaxis(T,0,3)
-		xa.Output['t1x'] = p[0,0,:]*np.sign(p[0,2,:])
-		xa.Output['t1y'] = p[0,1,:]*np.sign(p[0,2,:])
-		xa.Output['t1z'] = p[0,2,:]*np.sign(p[0,2,:])
-		xa.Output['t2x'] = p[1,0,:]*np.sign(p[1,2,:])
-		xa.Output['t2y'] = p[1,1,:]*np.sign(p[1,2,:])
-		xa.Output['t2z'] = p[1,2,:]*np.sign(p[1,2,:])
-		xa.Output['t3x'] = p[2,0,:]*np.sign(p[2,2,:])
-		xa.Output['t3y'] = p[2,1,:]*np.sign(p[2,2,:])
-		xa.Output['t3z'] = p[2,2,:]*np.sign(p[2,2,:])
+#
+#	Write the sign corrected tensor straight into the output frame
+		for i in range(3):
+			sgn = np.sign(p[i,2,:])
+			for j, c in enumerate('xyz'):
+				np.multiply(p[i,j,:], sgn, out=xa.Output['t'+str(i+1)+c])
 		xa.doOutput()
 	
 #
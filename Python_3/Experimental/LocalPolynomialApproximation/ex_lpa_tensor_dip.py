@@ -11,6 +11,7 @@ import numpy as np
 sys.path.insert(0, os.path.join(sys.path[0], '..', '..'))
 import extattrib as xa
 import extlib as xl
+import extnumba as xn
 #
 # These are the attribute parameters
 #
@@ -40,7 +41,7 @@ def doCompute():
 		xa.doInput()
 		r = np.zeros((10,xa.TI['nrsamp']))
 		for i in range(0,10):
-			r[i,:] = xl.sconvolve(xa.Input,kernel[i])
+			xl.sconvolve(xa.Input, kernel[i], output=r[i])
 #		A = np.rollaxis(np.array([[r[4],r[7]/2, r[8]/2], [r[7]/2, r[5], r[9]/2], [r[8]/2, r[9]/2, r[6]]]),2)
 		A = np.rollaxis(np.array([[r[4]*2,r[7], r[8]], [r[7], r[5]*2, r[9]], [r[8], r[9], r[6]*2]]),2)
 #		A = np.rollaxis(np.array([[2*r[4]],[2*r[5]],[2*r[6]]]),2)
@@ -66,23 +67,21 @@ def doCompute():
 		elif (norm == 4):
 #			G = np.sqrt(r[1]*r[1]+r[2]*r[2]+r[3]*r[3])
 			G = r[1]*r[1]+r[2]*r[2]+r[3]*r[3]
-			Groll = xl.rolling_window(G,51)
-			Gmin = np.pad(np.amin(Groll,-1),(25,25),'edge')
-			Gmax = np.pad(np.amax(Groll,-1),(25,25),'edge')
+			Gmin = np.empty(G.shape)
+			Gmax = np.empty(G.shape)
+			xn.winMinMax(G, 51, Gmin, Gmax)
 			Gtmp = ((G-Gmin)/(Gmax-Gmin))
 			G = Gtmp[:,np.newaxis,np.newaxis]
 			T = (1-G)*AAT + G*BBT
 		else:
 			Droll = xl.rolling_window(xa.Input, zs)
 			T = np.pad(np.cov(Droll),(xa.params['ZSampMargin']['Value'][1],xa.params['ZSampMargin']['Value'][1]),'edge')
-		evals, evecs = np.linalg.eigh(T)
-		ndx = evals.argsort()
-		evecs = evecs[np.arange(0,T.shape[0],1),:,ndx[:,2]]
-		eval2 = evals[np.arange(0,T.shape[0],1),ndx[:,2]]
-		eval1 = evals[np.arange(0,T.shape[0],1),ndx[:,0]]
+		evals, evecs = xl.eigen3(T[:,0,0], T[:,1,1], T[:,2,2], T[:,0,1], T[:,0,2], T[:,1,2])
+		eval2 = evals[0]
+		eval1 = evals[2]
 
-		xa.Output['Crl_dip'] = -evecs[:,1]/evecs[:,2]*crlFactor
-		xa.Output['Inl_dip'] = -evecs[:,0]/evecs[:,2]*inlFactor
+		xa.Output['Crl_dip'] = -evecs[1]/evecs[2]*crlFactor
+		xa.Output['Inl_dip'] = -evecs[0]/evecs[2]*inlFactor
 		xa.Output['True Dip'] = np.sqrt(xa.Output['Crl_dip']*xa.Output['Crl_dip']+xa.Output['Inl_dip']*xa.Output['Inl_dip'])
 		xa.Output['Dip Azimuth'] = np.degrees(np.arctan2(xa.Output['Inl_dip'],xa.Output['Crl_dip']))
 		coh = (eval2-eval1)/(eval2+eval1) 
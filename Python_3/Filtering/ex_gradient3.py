@@ -19,21 +19,14 @@ xa.params = {
 }
 
 def doCompute():
-    inlpos = xa.SI['nrinl']//2
-    crlpos = xa.SI['nrcrl']//2
-    filt = xa.params['Select']['Selection']
+    operator = 'scharr' if xa.params['Select']['Selection']==0 else 'kroon'
 
     while True:
         xa.doInput()
         indata = xa.Input['Input']
-        if filt==0:
-            xa.Output['In-line gradient']       = xl.scharr3_dx(indata, full=False)
-            xa.Output['Cross-line gradient']    = xl.scharr3_dy(indata, full=False)
-            xa.Output['Z gradient']             = xl.scharr3_dz(indata, full=False)
-        else:
-            xa.Output['In-line gradient']       = xl.kroon3(indata, axis=0)[inlpos,crlpos,:]
-            xa.Output['Cross-line gradient']    = xl.kroon3(indata, axis=1)[inlpos,crlpos,:]
-            xa.Output['Z gradient']             = xl.kroon3(indata, axis=-1)[inlpos,crlpos,:]
+        xl.gradient3(indata, operator, full=False, output=(  xa.Output['In-line gradient'],
+                                                            xa.Output['Cross-line gradient'],
+                                                            xa.Output['Z gradient']))
             
         xa.Output['Average Gradient']   =   (   xa.Output['In-line gradient'] 
                                             +   xa.Output['Cross-line gradient']
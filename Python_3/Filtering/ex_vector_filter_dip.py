@@ -5,7 +5,6 @@
 #
 import sys,os
 import numpy as np
-from numba import autojit
 #
 # Import the module with the I/O scaffolding of the External Attribute
 #
@@ -31,7 +30,7 @@ def doCompute():
 	crlFactor = xa.SI['zstep']/xa.SI['crldist'] * xa.SI['dipFactor']
 	zw = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
 	filt = xa.params['Select']['Selection']
-	filtFunc = autojit(xl.vecmean) if filt==0 else  autojit(xl.vmf_l1) if filt==1 else autojit(xl.vmf_l2)
+	filtFunc = ['mean', 'l1', 'l2'][filt]
 	while True:
 		xa.doInput()
 
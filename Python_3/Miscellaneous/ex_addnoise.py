@@ -27,6 +27,7 @@ xa.params = {
 	'ZSampMargin' : {'Value': [-5,5], 'Hidden': True, 'Symmetric': True},
 	'Par_0' : {'Name': 'S/N Ratio', 'Value': 1},
 	'Parallel' : True,
+	'Batch': 256,
 	'Help'  : 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/Add_Noise.html'
 }
 #
@@ -41,20 +42,20 @@ def doCompute():
 #	This is the trace processing loop
 #
 	while True:
-		xa.doInput()
-		data = xa.Input['Input'][0,0,:]
+		xa.doBatchInput()
+		data = xa.Input['Input'][:,0,0,:]
 #
 #   Compute noise
 #
-		vardata  = np.var(data)
-		noise = np.random.randn(data.shape[-1])
-		varnoise = np.var(noise)
+		vardata  = np.var(data, axis=-1, keepdims=True)
+		noise = np.random.randn(*data.shape)
+		varnoise = np.var(noise, axis=-1, keepdims=True)
 		scale = vardata/(varnoise*xa.params['Par_0']['Value'])
 #
 #	Output
 #
 		xa.Output = data + scale*noise
-		xa.doOutput()
+		xa.doBatchOutput()
 #
 # Assign the compute function to the attribute
 #
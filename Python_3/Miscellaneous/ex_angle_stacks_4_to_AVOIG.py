@@ -27,6 +27,7 @@ xa.params = {
 	'Par_1': {'Name': 'Mid Angle', 'Value': 23},
 	'Par_2': {'Name': 'Far Angle', 'Value': 29},
 	'Par_3': {'Name': 'UltraFar Angle', 'Value': 34},
+	'Batch': 256,
 	'Help': 'http://waynegm.github.io/OpendTect-Plugin-Docs/external_attributes/AVO_IG.html'
 }
 #
@@ -40,14 +41,15 @@ def doCompute():
 	angs = np.array([near_ang, mid_ang, far_ang, ufar_ang])
 
 	while True:
-		xa.doInput()
-
-		near = xa.Input['Near'][0,0,:]
-		mid = xa.Input['Mid'][0,0,:]
-		far = xa.Input['Far'][0,0,:]
-		ufar = xa.Input['UltraFar'][0,0,:]
-		refl = np.array([near,mid,far,ufar])
-		ns = near.shape[0]
+		xa.doBatchInput()
+#
+#	Solve for all samples of all traces in the batch at once
+		near = xa.Input['Near'][:,0,0,:]
+		mid = xa.Input['Mid'][:,0,0,:]
+		far = xa.Input['Far'][:,0,0,:]
+		ufar = xa.Input['UltraFar'][:,0,0,:]
+		refl = np.array([near,mid,far,ufar]).reshape(4,-1)
+		ns = refl.shape[-1]
     
 		G=np.zeros(ns)
 		I=np.zeros(ns)
@@ -58,7 +60,7 @@ def doCompute():
 		xa.Output['Intercept'] = I
 		xa.Output['Gradient'] = G
 		xa.Output['Quality'] = Q
-		xa.doOutput()
+		xa.doBatchOutput()
 
 def avo_IG_numpy(refls, angles, outI, outG, qual):
 	sangs = np.square(np.sin(angles/180*np.pi))
@@ -53,7 +53,7 @@ def doCompute():
 #
 # Local correlation - numba implementation
 #
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def localCorr( reference, match, winlen, nlag, lag, qual ):
     hwin = winlen//2
     lags = 2*nlag+1
@@ -62,8 +62,8 @@ def localCorr( reference, match, winlen, nlag, lag, qual ):
     cor = np.zeros(lags)
     refSSQ = np.zeros(ns)
     matSSQ = np.zeros(ns)
-    xn.winSSQ(reference,2*hxw+1,refSSQ)
-    xn.winSSQ(match,2*hxw+1,matSSQ)
+    xn.winSSQ(reference,2*hxw+1,refSSQ,True)
+    xn.winSSQ(match,2*hxw+1,matSSQ,True)
     for ir in range(hwin,ns-hwin):
         rbeg = ir - hxw
         rend = ir + hxw + 1
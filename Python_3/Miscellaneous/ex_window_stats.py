@@ -0,0 +1,68 @@
+#
+# Sliding window statistics along Z
+#
+# Mean, variance, RMS, skewness, excess kurtosis, median and 2 percentiles of the samples in a window
+# centred on each output sample. All outputs are computed in one pass over each trace by extnumba.winStats,
+# the window length is set by the Z sample margin.
+#
+# Input: Single trace seismic data
+# Output: Window Mean, Variance, RMS, Skewness, Kurtosis, Median, Lower and Upper Percentile
+#
+import sys,os
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute and the numba function library
+#
+sys.path.insert(0, os.path.join(sys.path[0], '..'))
+import extattrib as xa
+import extnumba as xn
+#
+# The attribute parameters
+#
+xa.params = {
+	'Inputs': ['Input'],
+	'Output': ['Mean', 'Variance', 'RMS', 'Skewness', 'Kurtosis', 'Median', 'Lower Percentile', 'Upper Percentile'],
+	'ZSampMargin' : {'Value': [-10,10], 'Minimum': [-1,1], 'Symmetric': True},
+	'Par_0' : {'Name': 'Lower Percentile', 'Value': 10},
+	'Par_1' : {'Name': 'Upper Percentile', 'Value': 90},
+	'Parallel' : False,
+	'Batch': 256,
+	'Help'  : 'https://github.com/waynegm/OpendTect-External-Attributes/blob/master/Python_3/Miscellaneous/README.md#ex_window_statspy'
+}
+#
+# Define the compute function
+#
+def doCompute():
+#
+#	Initialise some constants from the attribute parameters
+#
+	zw = xa.params['ZSampMargin']['Value'][1] - xa.params['ZSampMargin']['Value'][0] + 1
+	pcts = np.clip([50.0, xa.params['Par_0']['Value'], xa.params['Par_1']['Value']], 0, 100)
+#
+#	This is the trace processing loop
+#
+	while True:
+		xa.doBatchInput()
+		data = xa.Input['Input'][:,0,0,:]
+		moments = np.empty((data.shape[0], 5, data.shape[1]))
+		pctout = np.empty((data.shape[0], 3, data.shape[1]))
+#
+#	Compute all the window statistics in one pass over each trace
+#
+		xn.winStats2(data, zw, pcts, moments, pctout)
+#
+#	Output
+#
+		for i, out in enumerate(xa.params['Output'][:5]):
+			xa.Output[out] = moments[:,i,:]
+		for i, out in enumerate(xa.params['Output'][5:]):
+			xa.Output[out] = pctout[:,i,:]
+		xa.doBatchOutput()
+#
+# Assign the compute function to the attribute
+#
+xa.doCompute = doCompute
+#
+# Do it
+#
+xa.run(sys.argv[1:])
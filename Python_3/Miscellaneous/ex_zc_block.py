@@ -46,7 +46,7 @@ def doCompute():
 #
 # Square wave a trace
 #
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def response(inp, outp):
     ns = inp.shape[0]
     start = 0
@@ -0,0 +1,79 @@
+#
+# Thin client for External Attribute scripts running in server mode
+#
+# An attribute script started with --server=socket keeps running and serves
+# jobs over a Unix socket. This client takes the place of the script on the
+# OpendTect side: it accepts the same -g/--getpar and -c/--compute=json
+# arguments, forwards stdin to the server and copies the results back to
+# stdout. It only uses the standard library so it starts quickly.
+#
+# The socket is given by the --socket option or the EXTATTRIB_SERVER
+# environment variable.
+#
+import sys, getopt, os, json, socket, threading
+
+def forward(sock):
+	"""Copy stdin to sock, then signal the end of input."""
+	try:
+		while True:
+			data = os.read(sys.stdin.fileno(), 65536)
+			if not data:
+				break
+			sock.sendall(data)
+		sock.shutdown(socket.SHUT_WR)
+	except OSError:
+		pass
+
+def runJob(path, job, compute):
+	"""Send job to the server at path and copy the reply to stdout."""
+	sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	sock.connect(path)
+	sock.sendall(json.dumps(job).encode() + b'\n')
+	if compute:
+		threading.Thread(target=forward, args=(sock,), daemon=True).start()
+	out = sys.stdout.buffer
+	while True:
+		try:
+			data = sock.recv(65536)
+		except ConnectionResetError:
+			break
+		if not data:
+			break
+		out.write(data)
+		out.flush()
+	sock.close()
+
+def usage():
+	print("Usage: %s [--socket=path] [--capture=file] [-g | --getpar] [-c | --compute=json]\n" % sys.argv[0])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "hgc:", ["help", "getpar", "compute=", "capture=", "socket="])
+	except getopt.GetoptError as e:
+		print('Error in command line parameters: %s' % e, file=sys.stderr)
+		sys.exit(2)
+	path = os.environ.get('EXTATTRIB_SERVER')
+	job = []
+	compute = False
+	for opt, arg in opts:
+		if opt in ("-h", "--help"):
+			usage()
+			sys.exit()
+		elif opt == "--socket":
+			path = arg
+		elif opt in ("-g", "--getpar"):
+			job.append(opt)
+		else:
+			job.extend([opt, arg])
+			compute = compute or opt in ("-c", "--compute")
+	if not path:
+		print('No server socket, use --socket or set EXTATTRIB_SERVER', file=sys.stderr)
+		sys.exit(2)
+	try:
+		runJob(path, job, compute)
+	except OSError as err:
+		print('Error connecting to server %s: %s' % (path, err), file=sys.stderr)
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
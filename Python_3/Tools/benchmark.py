@@ -0,0 +1,221 @@
+#
+# Benchmark External Attribute scripts
+#
+# Finds attribute scripts (ex_*.py), drives each one with synthetic input
+# streams from synthstream.py at several stepout and Z window sizes and
+# records throughput, per trace latency percentiles, peak memory and JIT
+# warm up time. Traces are sent one at a time and each output is read back
+# before the next trace is sent, as OpendTect does. The results are written
+# to a JSON report and can be checked for regressions against a baseline
+# report.
+#
+import sys, getopt, os, io, json, glob, subprocess, tempfile, time, fnmatch
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute and
+# the synthetic stream generator
+#
+sys.path.insert(0, os.path.join(sys.path[0], '..'))
+import extattrib as xa
+import synthstream
+
+rootdir = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+excludes = ['Skeletons/*', 'tests/*', 'Tools/*']
+
+def findScripts(patterns=None):
+	"""Return the attribute scripts below rootdir, relative to rootdir."""
+	scripts = []
+	for path in sorted(glob.glob(os.path.join(rootdir, '**', 'ex_*.py'), recursive=True)):
+		rel = os.path.relpath(path, rootdir).replace(os.sep, '/')
+		if any(fnmatch.fnmatch(rel, pat) for pat in excludes):
+			continue
+		if patterns and not any(fnmatch.fnmatch(rel, pat) for pat in patterns):
+			continue
+		scripts.append(rel)
+	return scripts
+
+def getPar(script):
+	"""Return the parameter dictionary of script from --getpar and the time taken.
+
+	The time is dominated by interpreter start up and module imports.
+	"""
+	start = time.perf_counter()
+	proc = subprocess.run([sys.executable, os.path.join(rootdir, script), '--getpar'],
+							stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120)
+	return json.loads(proc.stdout.decode()), time.perf_counter() - start
+
+def configurations(par, stepouts, zmargins):
+	"""Return the (stepout, zmargin) pairs to benchmark for a script.
+
+	Stepouts and Z margins are only varied when the script has the parameter
+	and it is not hidden. Values below the parameter minimum are skipped.
+	"""
+	def sizes(key, values):
+		if key not in par:
+			return [0]
+		if par[key].get('Hidden', False):
+			return [max(abs(v) for v in par[key]['Value'])]
+		minimum = max(abs(v) for v in par[key].get('Minimum', [0]))
+		return [v for v in values if v >= minimum] or [minimum]
+	return [(so, zm) for so in sizes('StepOut', stepouts) for zm in sizes('ZSampMargin', zmargins)]
+
+def makeFrames(nrtrc, nrsamp, stepout, nrinput, nroutput):
+	"""Return the seismic info header and a list of trace frames."""
+	stream = io.BytesIO()
+	synthstream.writeStream(stream, nrtrc, nrsamp, (stepout, stepout), nrinput, nroutput)
+	data = stream.getvalue()
+	hdrsize = xa.dt_seisInfo.itemsize
+	frmsize = xa.dt_trcInfo.itemsize + nrinput * (2*stepout+1)**2 * nrsamp * 4
+	return data[:hdrsize], [data[hdrsize+ii*frmsize:hdrsize+(ii+1)*frmsize] for ii in range(nrtrc)]
+
+def runScript(script, par, stepout, zmargin, nrtrc, nrsamp, startup=0.0):
+	"""Benchmark one configuration of a script, return a result dictionary.
+
+	The JIT warm up time is estimated as the latency of the first trace less
+	the steady state median latency and the startup time of the script.
+	"""
+	nrinput = len(par['Inputs']) if 'Inputs' in par else 1
+	nroutput = len(par['Output']) if 'Output' in par else 1
+	compute = {}
+	if 'StepOut' in par:
+		compute['StepOut'] = dict(par['StepOut'], Value=[stepout, stepout])
+	if 'ZSampMargin' in par:
+		compute['ZSampMargin'] = dict(par['ZSampMargin'], Value=[-zmargin, zmargin])
+	header, frames = makeFrames(nrtrc, nrsamp, stepout, nrinput, nroutput)
+	outsize = nroutput * nrsamp * 4
+	result = {'script': script, 'stepout': stepout, 'zmargin': zmargin, 'nrsamp': nrsamp,
+			  'traces': 0, 'error': None}
+	with tempfile.TemporaryFile() as errf:
+		start = time.perf_counter()
+		proc = subprocess.Popen([sys.executable, os.path.join(rootdir, script), '--compute',
+								json.dumps(compute)], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+								stderr=errf)
+		latency = []
+		try:
+			proc.stdin.write(header)
+			for frame in frames:
+				t0 = time.perf_counter()
+				proc.stdin.write(frame)
+				proc.stdin.flush()
+				if len(proc.stdout.read(outsize)) != outsize:
+					raise RuntimeError('incomplete output')
+				latency.append(time.perf_counter() - t0)
+			proc.stdin.close()
+		except (OSError, RuntimeError):
+			errf.seek(0)
+			lines = errf.read().decode(errors='replace').strip().splitlines()
+			result['error'] = lines[-1] if lines else 'script stopped'
+		proc.stdout.close()
+		elapsed = time.perf_counter() - start
+		result['peak_rss_kb'] = waitRSS(proc)
+	if latency:
+		lat = np.array(latency)
+		steady = lat[1:] if lat.size > 1 else lat
+		result.update({
+			'traces': lat.size,
+			'elapsed_s': elapsed,
+			'first_trace_s': latency[0],
+			'startup_s': startup,
+			'warmup_s': max(latency[0] - float(np.median(steady)) - startup, 0.0),
+			'traces_per_s': steady.size / float(np.sum(steady)),
+			'samples_per_s': steady.size * nrsamp / float(np.sum(steady)),
+			'latency_ms': {'p50': 1000*float(np.percentile(steady, 50)),
+						   'p90': 1000*float(np.percentile(steady, 90)),
+						   'p99': 1000*float(np.percentile(steady, 99))}})
+	return result
+
+def waitRSS(proc):
+	"""Wait for proc and return its peak resident set size in kB if available."""
+	try:
+		pid, status, usage = os.wait4(proc.pid, 0)
+		proc.returncode = os.waitstatus_to_exitcode(status)
+		return usage.ru_maxrss
+	except (AttributeError, ChildProcessError):
+		proc.wait()
+		return None
+
+def resultKey(res):
+	return '%s stepout=%d zmargin=%d nrsamp=%d' % (res['script'], res['stepout'], res['zmargin'], res['nrsamp'])
+
+def findRegressions(results, baseline, tolerance):
+	"""Return messages for results slower than the baseline by more than tolerance."""
+	base = {resultKey(res): res for res in baseline.get('results', [])}
+	msgs = []
+	for res in results:
+		ref = base.get(resultKey(res))
+		if ref is None or not ref.get('traces_per_s'):
+			continue
+		if res['error'] is not None:
+			msgs.append('%s: failed (%s)' % (resultKey(res), res['error']))
+		elif res['traces_per_s'] < ref['traces_per_s'] * (1.0 - tolerance):
+			msgs.append('%s: %.1f traces/s, baseline %.1f traces/s' % (
+					resultKey(res), res['traces_per_s'], ref['traces_per_s']))
+	return msgs
+
+def usage():
+	print("Usage: %s [-n | --traces=count] [-s | --nrsamp=count] [--stepouts=list] [--zmargins=list]\n"
+		  "          [-o | --report=file] [-b | --baseline=file] [--tolerance=fraction] [pattern ...]\n" % sys.argv[0])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "hn:s:o:b:", ["help", "traces=", "nrsamp=", "stepouts=", "zmargins=",
+									"report=", "baseline=", "tolerance="])
+	except getopt.GetoptError as e:
+		print('Error in command line parameters: %s' % e)
+		sys.exit(2)
+	nrtrc = 200
+	nrsamp = 200
+	stepouts = [1, 2, 3]
+	zmargins = [2, 8, 15]
+	report = 'benchmark.json'
+	baseline = None
+	tolerance = 0.1
+	for opt, arg in opts:
+		if opt in ("-h", "--help"):
+			usage()
+			sys.exit()
+		elif opt in ("-n", "--traces"):
+			nrtrc = int(arg)
+		elif opt in ("-s", "--nrsamp"):
+			nrsamp = int(arg)
+		elif opt == "--stepouts":
+			stepouts = [int(v) for v in arg.split(',')]
+		elif opt == "--zmargins":
+			zmargins = [int(v) for v in arg.split(',')]
+		elif opt in ("-o", "--report"):
+			report = arg
+		elif opt in ("-b", "--baseline"):
+			baseline = arg
+		elif opt == "--tolerance":
+			tolerance = float(arg)
+	results = []
+	for script in findScripts(args):
+		try:
+			par, startup = getPar(script)
+		except (ValueError, subprocess.TimeoutExpired) as err:
+			results.append({'script': script, 'stepout': 0, 'zmargin': 0, 'nrsamp': nrsamp,
+							'traces': 0, 'error': 'getpar failed: %s' % err})
+			print('%s: getpar failed' % script)
+			continue
+		for stepout, zmargin in configurations(par, stepouts, zmargins):
+			res = runScript(script, par, stepout, zmargin, nrtrc, nrsamp, startup)
+			results.append(res)
+			if res['error'] is not None:
+				print('%s: failed (%s)' % (resultKey(res), res['error']))
+			else:
+				print('%s: %.1f traces/s p50 %.2f ms p99 %.2f ms warmup %.2f s rss %s kB' % (
+						resultKey(res), res['traces_per_s'], res['latency_ms']['p50'],
+						res['latency_ms']['p99'], res['warmup_s'], res['peak_rss_kb']))
+	with open(report, 'w') as f:
+		json.dump({'python': sys.version, 'numpy': np.__version__, 'traces': nrtrc,
+				   'results': results}, f, indent=1)
+	if baseline:
+		with open(baseline) as f:
+			msgs = findRegressions(results, json.load(f), tolerance)
+		for msg in msgs:
+			print('REGRESSION %s' % msg)
+		if msgs:
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,60 @@
+#
+# Precompile the numba kernels of External Attribute scripts
+#
+# Runs every attribute script (ex_*.py), or those matching the patterns given,
+# with the --precompile option so the numba functions it uses are compiled
+# for the argument types it calls them with and saved to the numba cache.
+# Run it once after installing or updating the scripts, as the user that
+# OpendTect runs them as, so production launches start computing without
+# waiting for the JIT. The cache is stored in __pycache__ beside each source
+# file unless the NUMBA_CACHE_DIR environment variable is set.
+#
+import sys, getopt, os, subprocess, time
+#
+# Use the script discovery of the benchmark runner
+#
+from benchmark import rootdir, findScripts
+
+def precompile(script, timeout):
+	"""Run script with --precompile, return the time taken and the last error line or None."""
+	start = time.perf_counter()
+	try:
+		proc = subprocess.run([sys.executable, os.path.join(rootdir, script), '--precompile'],
+								stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+	except subprocess.TimeoutExpired:
+		return time.perf_counter() - start, 'timed out'
+	elapsed = time.perf_counter() - start
+	if proc.returncode != 0:
+		lines = proc.stderr.decode(errors='replace').strip().splitlines()
+		return elapsed, lines[-1] if lines else 'exit status %d' % proc.returncode
+	return elapsed, None
+
+def usage():
+	print("Usage: %s [--timeout=seconds] [pattern ...]\n" % sys.argv[0])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "h", ["help", "timeout="])
+	except getopt.GetoptError as e:
+		print('Error in command line parameters: %s' % e)
+		sys.exit(2)
+	timeout = 600
+	for opt, arg in opts:
+		if opt in ("-h", "--help"):
+			usage()
+			sys.exit()
+		elif opt == "--timeout":
+			timeout = float(arg)
+	failed = 0
+	for script in findScripts(args):
+		elapsed, error = precompile(script, timeout)
+		if error is None:
+			print('%s: %.1f s' % (script, elapsed))
+		else:
+			print('%s: failed (%s)' % (script, error))
+			failed += 1
+	if failed:
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,89 @@
+#
+# Replay a captured External Attribute input stream
+#
+# Feeds an input stream recorded with the --capture option (or the
+# EXTATTRIB_CAPTURE environment variable, which records to the given name
+# with the process id appended) of an attribute script back into
+# any ex_*.py script, times the run and optionally stores the output stream
+# and compares it byte for byte with a reference output.
+#
+import sys, getopt, os, subprocess, time, filecmp
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute
+#
+sys.path.insert(0, os.path.join(sys.path[0], '..'))
+import extattrib as xa
+
+def streamInfo(filename):
+	"""Return the seismic info, number of traces and samples in a stream file."""
+	with open(filename, 'rb') as f:
+		SI = np.frombuffer(f.read(xa.dt_seisInfo.itemsize), dtype=xa.dt_seisInfo, count=1)[0]
+		ntraces = 0
+		nsamples = 0
+		while True:
+			hdr = f.read(xa.dt_trcInfo.itemsize)
+			if len(hdr) < xa.dt_trcInfo.itemsize:
+				break
+			nrsamp = np.frombuffer(hdr, dtype=xa.dt_trcInfo, count=1)[0]['nrsamp']
+			f.seek(int(SI['nrinput']) * int(SI['nrtraces']) * int(nrsamp) * 4, os.SEEK_CUR)
+			ntraces += 1
+			nsamples += nrsamp
+	return SI, ntraces, nsamples
+
+def replay(script, stream, compute='{}', output=None, env=None):
+	"""Run script on the stream file and return the elapsed wall time."""
+	with open(stream, 'rb') as fin, open(output or os.devnull, 'wb') as fout:
+		start = time.perf_counter()
+		proc = subprocess.run([sys.executable, script, '--compute', compute],
+								stdin=fin, stdout=fout, env=env)
+		elapsed = time.perf_counter() - start
+	if proc.returncode != 0:
+		raise RuntimeError('%s exited with status %d' % (script, proc.returncode))
+	return elapsed
+
+def usage():
+	print("Usage: %s [-c | --compute=json] [-o | --output=file] [--compare=file] [-n | --repeat=count] capture_file script\n" % sys.argv[0])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "hc:o:n:", ["help", "compute=", "output=", "compare=", "repeat="])
+	except getopt.GetoptError as e:
+		print('Error in command line parameters: %s' % e)
+		sys.exit(2)
+	compute = '{}'
+	output = None
+	compare = None
+	repeat = 1
+	for opt, arg in opts:
+		if opt in ("-h", "--help"):
+			usage()
+			sys.exit()
+		elif opt in ("-c", "--compute"):
+			compute = arg
+		elif opt in ("-o", "--output"):
+			output = arg
+		elif opt == "--compare":
+			compare = arg
+		elif opt in ("-n", "--repeat"):
+			repeat = max(1, int(arg))
+	if len(args) != 2:
+		usage()
+		sys.exit(2)
+	stream, script = args
+	SI, ntraces, nsamples = streamInfo(stream)
+	if compare and output is None:
+		output = os.path.splitext(stream)[0] + '.out'
+	times = [replay(script, stream, compute, output) for ii in range(repeat)]
+	best = min(times)
+	print('%s: %d traces (%dx%d, %d inputs) best %.3f s of %d, %.1f traces/s, %.4g samples/s' % (
+			os.path.basename(script), ntraces, SI['nrinl'], SI['nrcrl'], SI['nrinput'],
+			best, repeat, ntraces/best, nsamples/best))
+	if compare:
+		same = filecmp.cmp(output, compare, shallow=False)
+		print('Output %s %s' % ('matches' if same else 'differs from', compare))
+		if not same:
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,134 @@
+#
+# Synthetic External Attribute input stream generator
+#
+# Writes a valid External Attribute input stream, ie the seismic info header
+# followed by a trace info header and trace block for each trace, built from
+# the spherical test signal in Jupyter/test_signals.py or from random
+# reflectivity traces. The stream can be piped straight into an attribute
+# script or saved for use with replay.py.
+#
+import sys, getopt, os
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute and
+# the test signal library
+#
+toolsdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(toolsdir, '..', 'Jupyter'))
+sys.path.insert(0, os.path.join(toolsdir, '..'))
+import extattrib as xa
+import test_signals as ts
+
+derivs = [None, 'dx', 'dy', 'dz', 'dxx', 'dyy', 'dzz', 'dxy', 'dxz', 'dyz']
+
+def ricker(points, a):
+	"""Return a zero phase Ricker wavelet of points samples and width parameter a."""
+	t = np.arange(points) - (points - 1.0)/2
+	return 2/(np.sqrt(3*a)*np.pi**0.25) * (1 - (t/a)**2) * np.exp(-0.5*(t/a)**2)
+
+def makeRandomTrace(nrsamp, wavelet=ricker(80, 5)):
+	"""Return a random reflectivity trace of nrsamp samples convolved with wavelet.
+
+	This is make_random_signal from Jupyter/test_signals.py with the wavelet
+	built here, scipy.signal.ricker is not available in current SciPy.
+	"""
+	ref = np.random.rand(nrsamp)*2-1
+	return np.convolve(ref, wavelet, 'same')[:nrsamp]
+
+def makeVolumes(signal, nrinput, xsize, ysize, nrsamp, factor=5000):
+	"""Return a list of nrinput (xsize, ysize, nrsamp) test signal volumes.
+
+	For the 'spherical' signal successive inputs are the SphericalSignal and
+	its derivatives (dx, dy, dz, dxx ...) so multi-input attributes get
+	related inputs. For the 'random' signal every trace of every input is an
+	independent makeRandomTrace trace.
+	"""
+	vols = []
+	for inp in range(nrinput):
+		if signal == 'spherical':
+			vol = ts.SphericalSignal(factor, xsize, ysize, nrsamp, derivs[inp % len(derivs)]).data
+		elif signal == 'random':
+			vol = np.array([makeRandomTrace(nrsamp) for ii in range(xsize*ysize)])
+			vol = vol.reshape((xsize, ysize, nrsamp))
+		else:
+			raise ValueError('Unknown signal type: %s' % signal)
+		vols.append(vol.astype(np.float32))
+	return vols
+
+def writeStream(out, nrtrc, nrsamp, stepout=(1,1), nrinput=1, nroutput=1, signal='spherical',
+				size=(51,51), zstep=0.004, inldist=25.0, crldist=25.0, zFactor=1000.0,
+				dipFactor=1.0e6, seed=0):
+	"""Write a synthetic input stream of nrtrc traces to the binary file out.
+
+	Traces are taken in inline order from test signal volumes of size[0]
+	inlines by size[1] crosslines, wrapping around when more traces are
+	requested than the volume holds. The trace blocks around each position
+	include stepout[0] inlines and stepout[1] crosslines either side, padded
+	with the edge value at the volume boundary.
+
+	Returns:
+		the number of bytes written.
+	"""
+	np.random.seed(seed)
+	xs, ys = size
+	nrinl = 2*stepout[0]+1
+	nrcrl = 2*stepout[1]+1
+	SI = np.array([(nrinl*nrcrl, nrinput, nroutput, nrinl, nrcrl, zstep, inldist, crldist,
+					zFactor, dipFactor)], dtype=xa.dt_seisInfo)
+	nbytes = out.write(SI.tobytes())
+	pads = [np.pad(vol, ((stepout[0],stepout[0]),(stepout[1],stepout[1]),(0,0)), mode='edge')
+			for vol in makeVolumes(signal, nrinput, xs, ys, nrsamp)]
+	TI = np.zeros(1, dtype=xa.dt_trcInfo)
+	TI[0]['nrsamp'] = nrsamp
+	for trc in range(nrtrc):
+		x = (trc // ys) % xs
+		y = trc % ys
+		TI[0]['inl'] = x+1
+		TI[0]['crl'] = y+1
+		nbytes += out.write(TI.tobytes())
+		for pad in pads:
+			nbytes += out.write(np.ascontiguousarray(pad[x:x+nrinl, y:y+nrcrl, :]).tobytes())
+	return nbytes
+
+def usage():
+	print("Usage: %s [-n | --traces=count] [-s | --nrsamp=count] [--stepout=inl,crl] [--inputs=count]\n"
+		  "          [--outputs=count] [--signal=spherical|random] [--size=inl,crl] [--zstep=value]\n"
+		  "          [--inldist=value] [--crldist=value] [--seed=value] [output_file]\n" % sys.argv[0])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "hn:s:", ["help", "traces=", "nrsamp=", "stepout=", "inputs=",
+									"outputs=", "signal=", "size=", "zstep=", "inldist=", "crldist=", "seed="])
+	except getopt.GetoptError as e:
+		print('Error in command line parameters: %s' % e)
+		sys.exit(2)
+	kw = {}
+	nrtrc = 1000
+	nrsamp = 200
+	for opt, arg in opts:
+		if opt in ("-h", "--help"):
+			usage()
+			sys.exit()
+		elif opt in ("-n", "--traces"):
+			nrtrc = int(arg)
+		elif opt in ("-s", "--nrsamp"):
+			nrsamp = int(arg)
+		elif opt in ("--stepout", "--size"):
+			kw[opt[2:]] = tuple(int(v) for v in arg.split(','))
+		elif opt in ("--inputs", "--outputs"):
+			kw['nr'+opt[2:-1]] = int(arg)
+		elif opt == "--signal":
+			kw['signal'] = arg
+		elif opt in ("--zstep", "--inldist", "--crldist"):
+			kw[opt[2:]] = float(arg)
+		elif opt == "--seed":
+			kw['seed'] = int(arg)
+	if args and args[0] != '-':
+		with open(args[0], 'wb') as out:
+			writeStream(out, nrtrc, nrsamp, **kw)
+	else:
+		writeStream(sys.stdout.buffer, nrtrc, nrsamp, **kw)
+		sys.stdout.flush()
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -10,7 +10,7 @@
 # Date: 		March, 2016
 # Homepage:		http://waynegm.github.io/OpendTect-Plugin-Docs/External_Attributes/ExternalAttributes/
 #
-import sys, getopt, os, json
+import sys, getopt, os, io, json, select, threading, queue, time, bisect, collections, socket, copy, stat, tempfile
 import numpy as np
 
 import logging
@@ -21,11 +21,36 @@ lH = logging.StreamHandler()
 lH.setFormatter(logFormatter)
 logH.addHandler(lH)
 
+dt_trcInfo = np.dtype([	('nrsamp','i4'),
+						('z0','i4'),
+						('inl','i4'),
+						('crl','i4')])
+dt_seisInfo = np.dtype([('nrtraces','i4'),
+						('nrinput','i4'),
+						('nroutput','i4'),
+						('nrinl','i4'),
+						('nrcrl','i4'),
+						('zstep','f4'),
+						('inldist','f4'),
+						('crldist','f4'),
+						('zFactor','f4'),
+						('dipFactor','f4')])
+
 params = {}
 Input = {}
 Output = {}
 TI = {}
 SI = {}
+BatchTI = None
+_buffers = {}
+_batchHeader = None
+_batchEOF = False
+_batchError = None
+_pipeline = None
+_outputFrame = None
+_outputViews = []
+_profile = None
+_capture = None
 
 def doCompute():
     global Output
@@ -37,23 +62,573 @@ def doCompute():
 def doInput():
 	global Input
 	global TI
-	TI = np.frombuffer(sys.stdin.read(dt_trcInfo.itemsize), dtype=dt_trcInfo, count=1)[0]
-	nrsamples = TI['nrsamp']*SI['nrtraces']
+	if _profile is not None:
+		_profile.begin()
+	if _pipeline is not None:
+		frame = _pipeline.nextInput()
+		TI = frame['TI'][0]
+		if 'Inputs' in params:
+			Input.update(frame['Input'])
+		else:
+			Input = frame['Input'][None]
+	else:
+		readBuffer(_trcInfo, True)
+		TI = _trcInfo[0]
+		shape = (SI['nrinl'],SI['nrcrl'],TI['nrsamp'])
+		if 'Inputs' in params:
+			for inp in params['Inputs']:
+				Input[inp] = readBuffer(getBuffer(inp, shape))
+		else:
+			Input = readBuffer(getBuffer(None, shape))
+	_prepareOutput('Output', (_nrOutput(), TI['nrsamp']))
+	if _profile is not None:
+		_profile.mark('input')
+
+def doBatchInput():
+	"""Read a batch of up to params['Batch'] consecutive trace frames.
+
+	The first frame is waited for, further frames are only read while they
+	are already available on stdin and have the same number of samples. The
+	input traces are stacked along a new leading axis so each Input array has
+	shape (nbatch, nrinl, nrcrl, nrsamp) and BatchTI holds the trace info for
+	each trace in the batch. TI is set to the trace info of the first trace.
+	Without a 'Batch' parameter every batch holds a single trace. If the input
+	ends part way through a frame the complete frames already read are
+	returned first and the IOError is raised by the next call.
+	"""
+	global Input
+	global TI
+	global BatchTI
+	global _batchHeader
+	global _batchEOF
+	global _batchError
+	if _profile is not None:
+		_profile.begin()
+	maxbatch = max(1, int(params.get('Batch', 1)))
+	inputs = params['Inputs'] if 'Inputs' in params else [None]
+	if _pipeline is not None:
+		frames = _pipeline.nextBatch(maxbatch)
+		nrsamp = frames[0]['TI'][0]['nrsamp']
+		shape = (maxbatch, SI['nrinl'], SI['nrcrl'], nrsamp)
+		bufs = [getBuffer(('Batch', inp), shape) for inp in inputs]
+		tis = getBuffer(('Batch', 'TI'), (maxbatch,), dt_trcInfo)
+		for nb, frame in enumerate(frames):
+			tis[nb] = frame['TI'][0]
+			for inp, buf in zip(inputs, bufs):
+				buf[nb] = frame['Input'][inp]
+			_pipeline.release(frame)
+		_setBatchInput(inputs, bufs, tis[:len(frames)])
+		return
+	if _batchError is not None:
+		err, _batchError = _batchError, None
+		raise err
+	if _batchEOF:
+		raise EOFError('End of input')
+	if _batchHeader is None:
+		readBuffer(_trcInfo, True)
+		_batchHeader = _trcInfo.copy()
+	nrsamp = _batchHeader[0]['nrsamp']
+	shape = (maxbatch, SI['nrinl'], SI['nrcrl'], nrsamp)
+	bufs = [getBuffer(('Batch', inp), shape) for inp in inputs]
+	tis = getBuffer(('Batch', 'TI'), (maxbatch,), dt_trcInfo)
+	nb = 0
+	while True:
+		tis[nb] = _batchHeader[0]
+		try:
+			for buf in bufs:
+				readBuffer(buf[nb])
+		except IOError as err:
+			if nb == 0:
+				raise
+			_batchError = err
+			break
+		nb += 1
+		_batchHeader = None
+		if nb == maxbatch or not inputWaiting():
+			break
+		try:
+			readBuffer(_trcInfo, True)
+		except EOFError:
+			_batchEOF = True
+			break
+		except IOError as err:
+			_batchError = err
+			break
+		_batchHeader = _trcInfo.copy()
+		if _batchHeader[0]['nrsamp'] != nrsamp:
+			break
+	_setBatchInput(inputs, bufs, tis[:nb])
+
+def _setBatchInput(inputs, bufs, tis):
+	global Input
+	global TI
+	global BatchTI
+	nb = tis.shape[0]
+	BatchTI = tis
+	TI = BatchTI[0]
 	if 'Inputs' in params:
-		for inp in params['Inputs']:
-			Input[inp] = np.reshape(np.frombuffer(sys.stdin.read(nrsamples*4), dtype="f4", count=nrsamples),(SI['nrinl'],SI['nrcrl'],TI['nrsamp']))
+		for inp, buf in zip(inputs, bufs):
+			Input[inp] = buf[:nb]
 	else:
-		Input = np.reshape(np.frombuffer(sys.stdin.read(nrsamples*4), dtype="f4", count=nrsamples),(SI['nrinl'],SI['nrcrl'],TI['nrsamp']))
+		Input = bufs[0][:nb]
+	_prepareOutput(('Batch', 'Output'), (bufs[0].shape[0], _nrOutput(), TI['nrsamp']), nb)
+	if _profile is not None:
+		_profile.mark('input')
 
-def doOutput():
+def doBatchOutput():
+	"""Write the outputs for every trace of the current batch.
+
+	Each output must have the number of traces in the batch as its leading
+	dimension. The outputs are demultiplexed into per trace frames and the
+	whole batch is sent with a single write.
+	"""
+	doOutput()
+
+def _nrOutput():
+	return len(params['Output']) if 'Output' in params else 1
+
+def _prepareOutput(key, shape, nb=None):
+	"""Set up the float32 output frame for the next trace or batch.
+
+	Output is pointed at views of the frame, one per output, so scripts can
+	write their results straight into it. The frame is zeroed first so an
+	output the script does not assign, or only partly writes, is sent as
+	zeros rather than stale data from an earlier trace.
+	"""
 	global Output
+	global _outputFrame
+	global _outputViews
+	if _pipeline is not None:
+		frame = _pipeline.outputBuffer(shape if nb is None else (nb,)+shape[1:])
+	else:
+		frame = getBuffer(key, shape)
+		if nb is not None:
+			frame = frame[:nb]
+	frame[...] = 0
+	_outputFrame = frame
+	_outputViews = [frame[...,idx,:] for idx in range(shape[-2])]
 	if 'Output' in params:
-	  for out in params['Output']:
-	    sys.stdout.write(Output[out].astype(np.float32,copy=False).tobytes())
+		Output = dict(zip(params['Output'], _outputViews))
 	else:
-	    sys.stdout.write(Output.astype(np.float32,copy=False).tobytes())
+		Output = _outputViews[0]
+
+def inputWaiting():
+	"""Return True if data is available on stdin without blocking."""
+	try:
+		return bool(select.select([sys.stdin], [], [], 0)[0])
+	except (OSError, ValueError):
+		return False
+
+def getBuffer(key, shape, dtype=np.float32):
+	"""Return the persistent buffer for key with the given shape and dtype.
+
+	The buffer is only reallocated when the shape changes, ie when the number
+	of samples per trace changes.
+	"""
+	buf = _buffers.get(key)
+	if buf is None or buf.shape != shape or buf.dtype != dtype:
+		buf = np.empty(shape, dtype=dtype)
+		_buffers[key] = buf
+	return buf
+
+def readBuffer(buf, frameStart=False):
+	"""Fill buf in place from stdin.
+
+	If frameStart is True and the stream ends before any byte is read this is
+	the normal end of input and EOFError is raised. A stream ending part way
+	through buf raises IOError.
+	"""
+	view = memoryview(buf).cast('B')
+	nread = 0
+	while nread < view.nbytes:
+		n = sys.stdin.readinto(view[nread:])
+		if not n:
+			if frameStart and nread == 0:
+				raise EOFError('End of input')
+			raise IOError('Input ended after %d of %d bytes' % (nread, view.nbytes))
+		nread += n
+	return buf
+
+def writeBuffer(buf):
+	"""Write the whole of buf to stdout."""
+	view = memoryview(buf).cast('B')
+	nwritten = 0
+	while nwritten < view.nbytes:
+		nwritten += sys.stdout.write(view[nwritten:])
 	sys.stdout.flush()
-	
+
+def doOutput():
+	"""Send the output frame for the current trace or batch with one write.
+
+	Outputs that have been replaced by new arrays rather than written into
+	the views set up by doInput are copied into the frame first.
+	"""
+	if _profile is not None:
+		_profile.mark('compute')
+	if 'Output' in params:
+		for out, view in zip(params['Output'], _outputViews):
+			if Output[out] is not view:
+				view[...] = np.reshape(Output[out], view.shape)
+	elif Output is not _outputViews[0]:
+		_outputViews[0][...] = np.reshape(Output, _outputViews[0].shape)
+	if _pipeline is not None:
+		_pipeline.write(_outputFrame)
+	else:
+		writeBuffer(_outputFrame)
+	if _profile is not None:
+		_profile.mark('output')
+		_profile.count(_outputFrame)
+
+class _Pipeline:
+	"""Double buffered background reader and writer threads.
+
+	The reader thread decodes the next trace info header and input block from
+	stdin while the current trace is being computed and the writer thread
+	sends previous output frames to stdout. Frames pass through FIFO queues so
+	the output order is unchanged.
+	"""
+	def __init__(self, nframes=2):
+		self.free = queue.Queue()
+		for ii in range(nframes):
+			self.free.put({'TI': np.zeros(1, dtype=dt_trcInfo), 'Input': {}})
+		self.ready = queue.Queue()
+		self.pending = queue.Queue(maxsize=nframes)
+		self.spare = queue.Queue()
+		self.current = None
+		self.ahead = None
+		self.error = None
+		self.reader = threading.Thread(target=self._read, daemon=True)
+		self.writer = threading.Thread(target=self._write, daemon=True)
+		self.reader.start()
+		self.writer.start()
+
+	def _read(self):
+		inputs = params['Inputs'] if 'Inputs' in params else [None]
+		try:
+			while True:
+				frame = self.free.get()
+				if frame is None:
+					return
+				readBuffer(frame['TI'], True)
+				shape = (SI['nrinl'], SI['nrcrl'], frame['TI'][0]['nrsamp'])
+				for inp in inputs:
+					buf = frame['Input'].get(inp)
+					if buf is None or buf.shape != shape:
+						buf = np.empty(shape, dtype=np.float32)
+						frame['Input'][inp] = buf
+					readBuffer(buf)
+				self.ready.put(frame)
+		except Exception as err:
+			self.ready.put(err)
+
+	def _write(self):
+		while True:
+			buf = self.pending.get()
+			if buf is None:
+				return
+			if self.error is None:
+				try:
+					writeBuffer(buf)
+				except Exception as err:
+					self.error = err
+			self.spare.put(buf)
+
+	def nextFrame(self, block=True):
+		"""Return the next decoded frame.
+
+		If block is False None is returned when no frame is ready yet or the
+		reader has stopped. Errors from the reader are raised by blocking calls.
+		"""
+		if self.ahead is not None:
+			frame, self.ahead = self.ahead, None
+			return frame
+		try:
+			item = self.ready.get(block)
+		except queue.Empty:
+			return None
+		if isinstance(item, Exception):
+			self.ready.put(item)
+			if block:
+				raise item
+			return None
+		return item
+
+	def nextInput(self):
+		"""Release the frame of the previous trace and return the next one."""
+		if self.current is not None:
+			self.release(self.current)
+			self.current = None
+		self.current = self.nextFrame()
+		return self.current
+
+	def nextBatch(self, maxbatch):
+		"""Return up to maxbatch ready frames with the same number of samples."""
+		frames = [self.nextFrame()]
+		nrsamp = frames[0]['TI'][0]['nrsamp']
+		while len(frames) < maxbatch:
+			frame = self.nextFrame(False)
+			if frame is None:
+				break
+			if frame['TI'][0]['nrsamp'] != nrsamp:
+				self.ahead = frame
+				break
+			frames.append(frame)
+		return frames
+
+	def release(self, frame):
+		self.free.put(frame)
+
+	def outputBuffer(self, shape):
+		"""Return a float32 output frame, reusing one already written if possible."""
+		try:
+			buf = self.spare.get_nowait()
+		except queue.Empty:
+			buf = None
+		if buf is None or buf.shape != shape:
+			buf = np.empty(shape, dtype=np.float32)
+		return buf
+
+	def write(self, buf):
+		"""Queue an output frame for the writer thread."""
+		if self.error is not None:
+			raise self.error
+		self.pending.put(buf)
+
+	def close(self):
+		"""Wait for all queued output frames to be written and stop the reader.
+
+		A reader waiting for a free frame, eg after compute failed part way
+		through a job, is stopped with a sentinel. A reader blocked on stdin
+		stops when the input is closed.
+		"""
+		self.free.put(None)
+		self.pending.put(None)
+		self.writer.join()
+		self.reader.join(0.5)
+		if self.error is not None:
+			raise self.error
+
+class _Profile:
+	"""Running per phase timing and throughput statistics for the trace loop.
+
+	Times for input decode, the compute body between doInput and doOutput and
+	output encode are accumulated in log spaced histograms. A summary is
+	written through logH every interval seconds and at the end of the job.
+	Means and percentiles are per call, ie per trace or per batch. logH is
+	lowered to the INFO level for the job and restored by close.
+	"""
+	phases = ('input', 'compute', 'output')
+	edges = [1.0e-6 * 10**(ii/4) for ii in range(29)]
+
+	def __init__(self, interval):
+		self.interval = interval
+		self.level = logH.level
+		if logH.getEffectiveLevel() > logging.INFO:
+			logH.setLevel(logging.INFO)
+		self.hist = {phase: [0]*(len(self.edges)+1) for phase in self.phases}
+		self.total = dict.fromkeys(self.phases, 0.0)
+		self.ntraces = 0
+		self.nsamples = 0
+		self.start = self.last = self.reported = time.perf_counter()
+
+	def begin(self):
+		self.last = time.perf_counter()
+
+	def mark(self, phase):
+		"""Add the time since the previous mark to phase."""
+		now = time.perf_counter()
+		dt = now - self.last
+		self.last = now
+		self.hist[phase][bisect.bisect(self.edges, dt)] += 1
+		self.total[phase] += dt
+
+	def count(self, frame):
+		"""Count the traces and samples in an output frame, report if due."""
+		ntraces = frame.shape[0] if frame.ndim == 3 else 1
+		self.ntraces += ntraces
+		self.nsamples += ntraces * frame.shape[-1]
+		if self.last - self.reported >= self.interval:
+			self.report()
+
+	def percentile(self, phase, q):
+		"""Bound of the histogram bin holding the q quantile of phase in ms.
+
+		Returns '<upper' for the regular bins and '>=lower' for the overflow
+		bin beyond the last edge.
+		"""
+		counts = self.hist[phase]
+		target = q * sum(counts)
+		acc = 0
+		for ii, cnt in enumerate(counts):
+			acc += cnt
+			if cnt and acc >= target:
+				if ii < len(self.edges):
+					return '<%.3f' % (1000.0*self.edges[ii])
+				return '>=%.3f' % (1000.0*self.edges[-1])
+		return '<%.3f' % 0.0
+
+	def close(self):
+		"""Write the final report and restore the logH level."""
+		try:
+			self.report(True)
+		finally:
+			logH.setLevel(self.level)
+
+	def report(self, final=False):
+		self.reported = time.perf_counter()
+		elapsed = max(self.reported - self.start, 1.0e-9)
+		ncalls = max(sum(self.hist['output']), 1)
+		msg = ['%s: %d traces in %.1f s, %.1f traces/s, %.4g samples/s' % (
+				'Profile at end' if final else 'Profile', self.ntraces, elapsed,
+				self.ntraces/elapsed, self.nsamples/elapsed)]
+		for phase in self.phases:
+			msg.append('%s %.1f%% mean %.3f ms p50 %s ms p95 %s ms' % (
+				phase, 100.0*self.total[phase]/elapsed, 1000.0*self.total[phase]/ncalls,
+				self.percentile(phase, 0.5), self.percentile(phase, 0.95)))
+		logH.info('; '.join(msg))
+
+def profileInterval():
+	"""Return the profile report interval in seconds, 0 if profiling is off.
+
+	Profiling is switched on by a 'Profile' entry in params or the
+	EXTATTRIB_PROFILE environment variable, which takes precedence. The value
+	is the interval between reports in seconds, True selects 60 seconds.
+	"""
+	value = os.environ.get('EXTATTRIB_PROFILE', params.get('Profile', False))
+	if isinstance(value, str) and value.lower() in ('true', 'yes', 'on'):
+		value = True
+	if value is True:
+		return 60.0
+	try:
+		return max(float(value), 0.0)
+	except (TypeError, ValueError):
+		return 0.0
+
+class _CaptureReader(io.RawIOBase):
+	"""Raw stdin reader that tees every byte read into a capture file.
+
+	The capture holds the exact input stream, ie the seismic info header then
+	each trace info header and trace block, for replay outside OpendTect.
+	"""
+	def __init__(self, raw, capture):
+		self.raw = raw
+		self.capture = capture
+
+	def readable(self):
+		return True
+
+	def readinto(self, buf):
+		n = self.raw.readinto(buf)
+		if n:
+			self.capture.write(memoryview(buf).cast('B')[:n])
+		return n
+
+	def fileno(self):
+		return self.raw.fileno()
+
+	def close(self):
+		if not self.closed:
+			self.capture.close()
+		super().close()
+
+class ColumnCache:
+	"""Cache of per column results reused between overlapping trace blocks.
+
+	Neighbouring traces share all but one row or column of their StepOut
+	blocks. A ColumnCache applies func to each trace (column) of a block and
+	keeps the results keyed on the absolute inline and crossline of the
+	column, taken from TI, and the Z window, so only the columns entering the
+	block need to be computed as the position moves along a line.
+
+	The inline and crossline step between columns of the block is learnt from
+	the positions of successive traces. Unless check is False a cached result
+	is only used if the input column is unchanged, so a wrong step or an
+	unexpected position never gives a wrong result.
+
+	Args:
+		func: function taking a 1D trace and returning an array.
+		size: optional, the maximum number of columns kept. Default is twice
+			the number of traces in a block.
+		check: optional, compare the input column before reusing a result.
+			Default is True.
+		vectorised: optional, func takes a 2D array of traces and returns
+			the results stacked along the first axis, so all the columns
+			entering a block are computed in one call. Default is False.
+	"""
+	def __init__(self, func, size=None, check=True, vectorised=False):
+		self.func = func
+		self.size = size
+		self.check = check
+		self.vectorised = vectorised
+		self.steps = [0, 0]
+		self.hits = 0
+		self.misses = 0
+		self._last = None
+		self._columns = collections.OrderedDict()
+		self._out = None
+
+	def _learnSteps(self, inl, crl):
+		if self._last is not None:
+			lastinl, lastcrl = self._last
+			if crl == lastcrl:
+				self._setStep(0, abs(inl-lastinl))
+			if inl == lastinl:
+				self._setStep(1, abs(crl-lastcrl))
+		self._last = (inl, crl)
+
+	def _setStep(self, axis, step):
+		if step and (not self.steps[axis] or step < self.steps[axis]):
+			self.steps[axis] = step
+
+	def block(self, data, ti=None):
+		"""Return func applied to every column of a (nrinl, nrcrl, nrsamp) block.
+
+		The returned array has shape (nrinl, nrcrl) + the shape of the func
+		result and is overwritten by the next call. ti defaults to TI and
+		should be the trace header of the block, eg a BatchTI entry in batch
+		mode.
+		"""
+		ti = TI if ti is None else ti
+		nx, ny = data.shape[0], data.shape[1]
+		inl = int(ti['inl'])
+		crl = int(ti['crl'])
+		z0 = int(ti['z0'])
+		self._learnSteps(inl, crl)
+		sx = self.steps[0] or 1
+		sy = self.steps[1] or 1
+		results = {}
+		missing = []
+		for i in range(nx):
+			for j in range(ny):
+				key = (inl+(i-nx//2)*sx, crl+(j-ny//2)*sy, z0, data.shape[-1])
+				entry = self._columns.get(key)
+				if entry is not None and (not self.check or np.array_equal(entry[0], data[i,j])):
+					self._columns.move_to_end(key)
+					results[(i,j)] = entry[1]
+					self.hits += 1
+				else:
+					missing.append((i, j, key))
+		if missing:
+			if self.vectorised:
+				computed = self.func(np.array([data[i,j] for i, j, key in missing]))
+			else:
+				computed = [np.asarray(self.func(data[i,j])) for i, j, key in missing]
+			for (i, j, key), res in zip(missing, computed):
+				self._columns[key] = (np.array(data[i,j]) if self.check else None, res)
+				self._columns.move_to_end(key)
+				results[(i,j)] = res
+			self.misses += len(missing)
+		res = results[(0,0)]
+		shape = (nx, ny) + res.shape
+		if self._out is None or self._out.shape != shape or self._out.dtype != res.dtype:
+			self._out = np.empty(shape, dtype=res.dtype)
+		for (i, j), res in results.items():
+			self._out[i,j] = res
+		limit = self.size or 2*nx*ny
+		while len(self._columns) > limit:
+			self._columns.popitem(last=False)
+		return self._out
+
 def writePar():
 	try:
 		json.dump(params, sys.stdout)
@@ -71,35 +646,179 @@ def readPar(jsonStr):
 		sys.exit(1)
 
 def preCompute():
-	global dt_trcInfo
 	global SI
 	global Output
+	global _trcInfo
+	global _batchHeader
+	global _batchEOF
+	global _batchError
+	global _pipeline
+	global _profile
 	Output = {}
-	sys.stdin = os.fdopen(sys.stdin.fileno(), 'rb', 0) 
-	sys.stdout = os.fdopen(sys.stdout.fileno(), 'wb', 0)
-	dt_trcInfo = np.dtype([	('nrsamp','i4'),
-							('z0','i4'),
-							('inl','i4'),
-							('crl','i4')])
-	dt_seisInfo = np.dtype([('nrtraces','i4'),
-							('nrinput','i4'),
-							('nroutput','i4'),
-							('nrinl','i4'),
-							('nrcrl','i4'),
-							('zstep','f4'),
-							('inldist','f4'),
-							('crldist','f4'),
-							('zFactor','f4'),
-							('dipFactor','f4')])
+	_buffers.clear()
+	_batchHeader = None
+	_batchEOF = False
+	_batchError = None
+	sys.stdin = os.fdopen(sys.stdin.fileno(), 'rb', 0, closefd=False)
+	sys.stdout = os.fdopen(sys.stdout.fileno(), 'wb', 0, closefd=False)
+	capture = _capture
+	if not capture and os.environ.get('EXTATTRIB_CAPTURE'):
+#	Each process of a parallel attribute gets its own file
+		capture = '%s.%d' % (os.environ['EXTATTRIB_CAPTURE'], os.getpid())
+	if capture:
+		sys.stdin = _CaptureReader(sys.stdin, open(capture, 'wb'))
+	_trcInfo = np.zeros(1, dtype=dt_trcInfo)
 	SI = np.frombuffer(sys.stdin.read(dt_seisInfo.itemsize), dtype=dt_seisInfo, count=1)[0]
+	if params.get('Prefetch', False):
+		_pipeline = _Pipeline(max(2, int(params.get('Batch', 1))+1))
+	interval = profileInterval()
+	if interval > 0:
+		_profile = _Profile(interval)
+
+def postCompute():
+	global _pipeline
+	global _profile
+	if _pipeline is not None:
+		pipeline, _pipeline = _pipeline, None
+		try:
+			pipeline.close()
+		except Exception:
+			logH.error("Error writing output", exc_info=True)
+	if _profile is not None:
+		profile, _profile = _profile, None
+		profile.close()
+	if isinstance(sys.stdin, _CaptureReader):
+		sys.stdin.close()
+
+def precompile(nrtrc=4, nrsamp=128):
+	"""Run the script once on random input so numba compiles and caches its kernels.
+
+	The compute function is run with the default parameters on nrtrc traces
+	of random float32 data and the output is discarded. Every numba function
+	declared with cache=True that it reaches is compiled for the argument
+	types it is actually called with and saved to the numba cache, so later
+	launches load the compiled code instead of compiling on the first trace.
+	Functions only reached with other parameter values still compile on
+	first use.
+
+	Returns:
+		the time taken in seconds.
+	"""
+	global _capture
+	start = time.perf_counter()
+	margin = max(abs(v) for v in params['ZSampMargin']['Value']) if 'ZSampMargin' in params else 0
+	nrsamp = max(nrsamp, 4*margin+1)
+	stepout = params['StepOut']['Value'] if 'StepOut' in params else [0, 0]
+	nrinl = 2*stepout[0]+1
+	nrcrl = 2*stepout[1]+1
+	nrinput = len(params['Inputs']) if 'Inputs' in params else 1
+	info = np.array([(nrinl*nrcrl, nrinput, _nrOutput(), nrinl, nrcrl, 0.004, 25.0, 25.0, 1000.0, 1.0e6)],
+					dtype=dt_seisInfo)
+	ti = np.zeros(1, dtype=dt_trcInfo)
+	ti[0]['nrsamp'] = nrsamp
+	rng = np.random.RandomState(0)
+	savedIn = os.dup(0)
+	savedOut = os.dup(1)
+	with tempfile.TemporaryFile() as stream, open(os.devnull, 'wb') as null:
+		stream.write(info.tobytes())
+		for trc in range(nrtrc):
+			ti[0]['inl'] = trc+1
+			ti[0]['crl'] = 1
+			stream.write(ti.tobytes())
+			stream.write(rng.standard_normal((nrinput, nrinl, nrcrl, nrsamp)).astype(np.float32).tobytes())
+		stream.seek(0)
+		_capture = None
+		os.dup2(stream.fileno(), 0)
+		os.dup2(null.fileno(), 1)
+		try:
+			preCompute()
+			doCompute()
+		except (EOFError, SystemExit):
+			pass
+		finally:
+			postCompute()
+			sys.stdin = sys.__stdin__
+			sys.stdout = sys.__stdout__
+			os.dup2(savedIn, 0)
+			os.dup2(savedOut, 1)
+			os.close(savedIn)
+			os.close(savedOut)
+	return time.perf_counter() - start
 
 def usage():
-	print("Usage: %s \n" % sys.argv[0])
+	print("Usage: %s [--capture=file] [--server=socket] [--precompile] [-g | --getpar] [-c | --compute=json]\n" % sys.argv[0])
+
+def _readJob(conn):
+	"""Read the newline terminated JSON argument list that starts a server job."""
+	line = bytearray()
+	while True:
+		ch = conn.recv(1)
+		if not ch:
+			raise EOFError('Connection closed before job arguments')
+		if ch == b'\n':
+			return json.loads(line.decode())
+		line += ch
+
+def serve(path):
+	"""Run jobs from thin clients on a Unix socket until interrupted.
+
+	Each connection is one job. The client sends its command line arguments
+	as a JSON list terminated by a newline, then the usual input stream, and
+	receives the usual output stream. Jobs run one at a time in this process,
+	with the socket in place of stdin and stdout, so imported modules and JIT
+	compiled functions stay warm between jobs. params is reset to the script
+	defaults before each job.
+	"""
+	global _capture
+	defaults = copy.deepcopy(params)
+	if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+		os.unlink(path)
+	srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	srv.bind(path)
+	srv.listen(4)
+	savedIn = os.dup(0)
+	savedOut = os.dup(1)
+	logH.warning('Serving on %s' % path)
+	try:
+		while True:
+			conn, addr = srv.accept()
+			with conn:
+				try:
+					opts, args = getopt.getopt(_readJob(conn), "gc:", ["getpar", "compute=", "capture="])
+				except (EOFError, ValueError, getopt.GetoptError) as err:
+					logH.error('Invalid job: %s' % err)
+					continue
+				params.clear()
+				params.update(copy.deepcopy(defaults))
+				_capture = None
+				os.dup2(conn.fileno(), 0)
+				os.dup2(conn.fileno(), 1)
+				try:
+					_runJob(opts)
+				except SystemExit:
+					pass
+				finally:
+					try:
+						conn.shutdown(socket.SHUT_RDWR)
+					except OSError:
+						pass
+					sys.stdin = sys.__stdin__
+					sys.stdout = sys.__stdout__
+					os.dup2(savedIn, 0)
+					os.dup2(savedOut, 1)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		srv.close()
+		try:
+			os.unlink(path)
+		except FileNotFoundError:
+			pass
 
 def run(argv):
 	global logH
 	try:
-		opts, args = getopt.getopt(argv,"hgc:",["help", "getpar", "compute="])
+		opts, args = getopt.getopt(argv,"hgc:",["help", "getpar", "compute=", "capture=", "server=", "precompile"])
 	except getopt.GetoptError as e:
 		logH.error('Error in command line parameters: %s' % e)
 		sys.exit(2)
@@ -107,7 +826,25 @@ def run(argv):
 		if opt in ("-h", "--help"):
 			usage()
 			sys.exit()
-		elif opt in ("-g", "--getpar"):
+		elif opt == "--server":
+			serve(arg)
+			sys.exit()
+		elif opt == "--precompile":
+			try:
+				logH.info('Precompiled in %.1f s' % precompile())
+			except Exception:
+				logH.error("Fatal error in precompile", exc_info=True)
+				sys.exit(1)
+			sys.exit()
+	_runJob(opts)
+
+def _runJob(opts):
+	global _capture
+	for opt, arg in opts:
+		if opt == "--capture":
+			_capture = arg
+	for opt, arg in opts:
+		if opt in ("-g", "--getpar"):
 			try:
 				writePar()
 				sys.exit()
@@ -119,8 +856,9 @@ def run(argv):
 				preCompute()
 				doCompute()
 				sys.exit()
+			except EOFError:
+				pass
 			except Exception:
 				logH.error("Fatal error in compute", exc_info=True)
-
-  
-
+			finally:
+				postCompute()
@@ -10,10 +10,12 @@
 # Date: 		March, 2016
 # Homepage:		http://waynegm.github.io/OpendTect-Plugin-Docs/External_Attributes/ExternalAttributes/
 #
+import math
 import numpy as np
 import scipy.ndimage as ndi
 import scipy.signal as ss
-from numba import autojit, jit, double
+import scipy.fft as sfft
+from numba import jit, prange
 
 
 #
@@ -25,13 +27,34 @@ def getOutput(output, input, shape=None):
         output = np.zeros(shape, dtype=input.dtype.name)
     elif type(output) in [type(type), type(np.zeros((4,)).dtype)]:
         output = np.zeros(shape, dtype=output)
-    elif isinstance(output, string_types):
-        output = np.typeDict[output]
-        output = np.zeros(shape, dtype=output)
+    elif isinstance(output, str):
+        output = np.zeros(shape, dtype=np.dtype(output))
     elif output.shape != shape:
         raise RuntimeError("output shape not correct")
     return output
 
+#
+# Normalise a possibly negative axis index, as scipy.ndimage does for its filters
+#
+def _checkAxis(axis, ndim):
+	if not -ndim <= axis < ndim:
+		raise ValueError('invalid axis %d for %d dimensional input' % (axis, ndim))
+	return axis % ndim
+
+# First derivative filters as (derivative, smoothing) weights
+#
+derivative_filters = {
+	'kroon':	([-0.5, 0, 0.5], [0.178947, 0.642105, 0.178947]),
+	'scharr':	([-0.5, 0, 0.5], [0.12026, 0.75948, 0.12026]),
+	'farid5':	([-0.109604, -0.276691, 0.000000, 0.276691, 0.109604],
+				 [0.037659, 0.249153, 0.426375, 0.249153, 0.037659])
+}
+#
+# Second derivative filters as (first derivative, second derivative, smoothing) weights
+#
+hessian_filters = {
+	'scharr':	([-0.5, 0, 0.5], [1, -2, 1], [0.21478, 0.57044, 0.21478])
+}
 # 
 #
 def hilbert_kernel(N, band=0.9):
@@ -53,6 +76,55 @@ def hilbert_kernel(N, band=0.9):
 	result = ss.firwin(2*N+1,band/2, window="nuttall") * np.exp(x) * 2
 	return result
 
+#
+#
+_hilbertCache = {}
+def analytic_signal( input, N, band=0.9, dtype=np.complex128, method="auto"):
+	"""Analytic signal of every trace of a block using the Hilbert kernel.
+
+	Applies the hilbert_kernel FIR along the last axis of the input in one
+	vectorised call, giving the same result as np.convolve(trace, kernel,
+	mode="same") for each trace. Short kernels are applied directly, long
+	ones by FFT. The kernel and its spectrum are cached per (N, band) and
+	(N, band, nrsamp).
+
+	Args:
+		input: the real array of traces, the last axis is Z.
+		N: the half-length of the transform kernel.
+		band: optional, specifies the bandwidth of the transform
+			in normalised frequency where 1.0 is the nyquist. Default is 0.9.
+		dtype: optional, complex output type, np.complex64 or the default
+			np.complex128.
+		method: optional, {'auto', 'direct', 'fft'} how the kernel is
+			applied. Default is 'auto' which uses FFT for kernels longer
+			than 15 points.
+
+	Returns:
+		complex array with the same shape as the input.
+	"""
+	input = np.asarray(input)
+	nrsamp = input.shape[-1]
+	dtype = np.dtype(dtype)
+	real = np.float32 if dtype == np.complex64 else np.float64
+	kernel = _hilbertCache.get((N, band))
+	if kernel is None:
+		kernel = hilbert_kernel(N, band)
+		_hilbertCache[(N, band)] = kernel
+	if method == "auto":
+		method = "fft" if 2*N+1 > 15 else "direct"
+	if method == "direct":
+		input = input.astype(real, copy=False)
+		output = np.empty(input.shape, dtype=dtype)
+		output.real = ndi.convolve1d(input, kernel.real, -1, mode="constant", cval=0.0)
+		output.imag = ndi.convolve1d(input, kernel.imag, -1, mode="constant", cval=0.0)
+		return output
+	key = (N, band, nrsamp, dtype.name)
+	spectrum = _hilbertCache.get(key)
+	if spectrum is None:
+		spectrum = sfft.fft(kernel.astype(dtype), sfft.next_fast_len(nrsamp + 2*N))
+		_hilbertCache[key] = spectrum
+	output = sfft.ifft(sfft.fft(input.astype(real, copy=False), spectrum.shape[0], axis=-1) * spectrum, axis=-1)
+	return output[..., N:N+nrsamp]
 # 
 #
 def scharr3( input, axis=-1, output=None, mode="reflect", cval=0.0):
@@ -69,9 +141,11 @@ def scharr3( input, axis=-1, output=None, mode="reflect", cval=0.0):
 			derivative. Default is the last axis.
 		output: optional, an array to store the derivative filter output.
 			Should be the same shape as the input array.
-		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
-			specifies how the array boundaries are filtered. Default is
-			'reflect'.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap', 'valid'}
+			optional, specifies how the array boundaries are filtered.
+			'valid' only computes the traces free of boundary effects, so
+			the lateral (all but the last) axes of the output are 2 shorter,
+			and reflects along the last axis. Default is 'reflect'.
 		cval: optional, specified value to pad input array if mode is 
 			'constant'. Default is 0.0.
 			
@@ -80,12 +154,47 @@ def scharr3( input, axis=-1, output=None, mode="reflect", cval=0.0):
 		dimension indices 1:-1 will be free of boundary effects. 
 	"""
 	input = np.asarray(input)
-	axis = ndi._ni_support._check_axis(axis, input.ndim)
+	axis = _checkAxis(axis, input.ndim)
+	deriv, smooth = derivative_filters['scharr']
+	if mode == 'valid':
+		weights = [smooth] * input.ndim
+		weights[axis] = deriv
+		return _separableValid(input, weights, output)
 	output = getOutput(output, input)
-	ndi.correlate1d(input, [-0.5, 0, 0.5], axis, output, mode, cval, 0)
+	ndi.correlate1d(input, deriv, axis, output, mode, cval, 0)
 	axes = [ii for ii in range(input.ndim) if ii != axis]
 	for ii in axes:
-		ndi.correlate1d(output, [0.12026,0.75948,0.12026], ii, output, mode, cval, 0)
+		ndi.correlate1d(output, smooth, ii, output, mode, cval, 0)
+	return output
+#
+#
+def _separableValid( input, weights, output=None ):
+	"""Apply separable filter to the input trace buffer, boundary free traces only.
+
+	The lateral (all but the last) axes are only filtered where the filter
+	fits inside the input, so along each of them the output is
+	len(weights[axis])-1 shorter than the input and none of the boundary
+	contaminated traces are computed or allocated. The last (Z) axis keeps
+	its length and is filtered with 'reflect' boundaries.
+
+	Args:
+		input: the array to be filtered.
+		weights: sequence with the filter weights for each axis of input.
+		output: optional, an array to store the filter output. Should be the
+			same shape as the returned array.
+
+	Returns:
+		filtered array with shape input.shape[i]-len(weights[i])+1 along
+		the lateral axes.
+	"""
+	result = np.asarray(input)
+	for axis in range(result.ndim-1):
+		nw = len(weights[axis])
+		if result.shape[axis] < nw:
+			raise ValueError("%d traces along axis %d is too small for a %d point filter" % (result.shape[axis], axis, nw))
+		result = _contract(result, weights[axis], axis, result.shape[axis]-nw+1)
+	output = getOutput(output, result)
+	ndi.correlate1d(result, weights[-1], -1, output, 'reflect', 0.0, 0)
 	return output
 #
 #
@@ -103,9 +212,10 @@ def _separableFilterFull( input, weights, output=None, mode="reflect", cval=0.0)
 		weights: array with filter weights for each dimension of input
 		output: optional, a 1D array to store the derivative filter output.
 			Should be the same length as the last dimension of the input.
-		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
-			specifies how the array boundaries are filtered. Default is
-			'reflect'. Only applies along the last axis of the input
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap', 'valid'}
+			optional, specifies how the array boundaries are filtered.
+			Default is 'reflect'. 'valid' only computes the traces free of
+			boundary effects, see _separableValid.
 		cval: optional, specified value to pad input array if mode is 
 			'constant'. Default is 0.0.
 
@@ -114,6 +224,8 @@ def _separableFilterFull( input, weights, output=None, mode="reflect", cval=0.0)
 		will be affected by boundary effects. 
 	"""
 	input = np.asarray(input)
+	if mode == 'valid':
+		return _separableValid(input, weights, output)
 	output = getOutput(output, input)
 	ndi.correlate1d(input, weights[0], 0, output, mode, cval, 0)
 	ndi.correlate1d(output, weights[1], 1, output, mode, cval, 0)
@@ -554,23 +666,89 @@ def scharr3_Hessian( input, full=True, mode="reflect", cval=0.0):
 	the centre trace of the NxM block if full is False. If full is True the
 	Hessian is calculated for all traces but a certain number of the outer
 	traces in the output, determined by the dimensions of the weights array,
-	will be contaminated by boundary effects.
+	will be contaminated by boundary effects. See hessian3 for the compact
+	form without the duplicate entries.
 	
 	Returns:
 		for full=True: Hessian array the same shape as input
 		for full=False: Hessian the same length as last dimension of the input.
 	"""
-	hxx = scharr3_dxx(input, None, full, mode, cval)
-	hyy = scharr3_dyy(input, None, full, mode, cval)
-	hzz = scharr3_dzz(input, None, full, mode, cval)
-	hxy = scharr3_dxy(input, None, full, mode, cval)
-	hxz = scharr3_dxz(input, None, full, mode, cval)
-	hyz = scharr3_dyz(input, None, full, mode, cval)
-	
-	return np.array([[ hxx, hxy, hxz ],
-                     [ hxy, hyy, hyz ],
-                     [ hxz, hyz, hzz]])
-	
+	h = hessian3(input, 'scharr', full=full, mode=mode, cval=cval)
+	return h[[[0, 3, 4], [3, 1, 5], [4, 5, 2]]]
+#
+#
+def hessian3( input, operator='scharr', output=None, full=True, size=None, mode="reflect", cval=0.0):
+	"""Second derivatives along and across all 3 axes with shared filter passes.
+
+	Returns the same second derivatives as the scharr3_dxx ... scharr3_dyz
+	functions but the filter passes along the first two axes are shared
+	between the six components, so a full block needs 15 filter passes
+	rather than 18. When full is False the lateral axes are contracted first
+	as in gradient3 and only the centre trace or a central sub-block is
+	computed. The components are returned in the compact symmetric order
+	xx, yy, zz, xy, xz, yz, the argument order of eigen3, so eg
+	eigen3(*hessian3(block, full=False)) gives the eigenvalues of the
+	Hessian at the centre trace.
+
+	Args:
+		input: the NxMxNS block of traces.
+		operator: optional, {'scharr'} the derivative filters, see
+			hessian_filters. Default is 'scharr'.
+		output: optional, an array to store the result. Should be the same
+			shape as the returned array.
+		full: optional, boolean determining if the Hessian is calculated for
+			all traces (True, the default) or only the centre trace or a
+			central sub-block (False)
+		size: optional, for full==False the number of output traces along
+			each lateral axis as an int or tuple. Default is None for the
+			centre trace only.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
+			specifies how the array boundaries are filtered. Default is
+			'reflect'. For full==False only applies along the Z axis.
+		cval: optional, specified value to pad input array if mode is
+			'constant'. Default is 0.0.
+
+	Returns:
+		array with the xx, yy, zz, xy, xz and yz second derivatives stacked
+		along the first axis.
+		for full==True: shape (6,) + input.shape
+		for full==False and size==None: shape (6, NS)
+		for full==False: shape (6,) + size + (NS,).
+	"""
+	input = np.asarray(input)
+	if input.ndim != 3:
+		raise ValueError("hessian3 requires a 3D input block")
+	first, second, smooth = hessian_filters[operator]
+	zweights = (smooth, smooth, second, smooth, first, first)
+	if full:
+		result = getOutput(output, input, (6,) + input.shape)
+		sx = np.empty_like(input)
+		dx = np.empty_like(input)
+		tmp1 = np.empty_like(input)
+		tmp2 = np.empty_like(input)
+		ndi.correlate1d(input, smooth, 0, sx, mode, cval, 0)
+		ndi.correlate1d(input, first, 0, dx, mode, cval, 0)
+		ndi.correlate1d(input, second, 0, tmp1, mode, cval, 0)
+		lateral = ((tmp1, smooth), (sx, second), (sx, smooth), (dx, first), (dx, smooth), (sx, first))
+		for k, ((lat, weights), zw) in enumerate(zip(lateral, zweights)):
+			ndi.correlate1d(lat, weights, 1, tmp2, mode, cval, 0)
+			ndi.correlate1d(tmp2, zw, 2, result[k], mode, cval, 0)
+		return result
+	sizes = _lateralSizes(size)
+	sx = _contract(input, smooth, 0, sizes[0])
+	dx = _contract(input, first, 0, sizes[0])
+	dxx = _contract(input, second, 0, sizes[0])
+	lateral = [	_contract(dxx, smooth, 1, sizes[1]),
+				_contract(sx, second, 1, sizes[1]),
+				_contract(sx, smooth, 1, sizes[1]),
+				_contract(dx, first, 1, sizes[1]),
+				_contract(dx, smooth, 1, sizes[1]),
+				_contract(sx, first, 1, sizes[1])]
+	shape = lateral[0].shape if size is not None else (input.shape[-1],)
+	result = getOutput(output, lateral[0], (6,) + shape)
+	for k, (lat, zw) in enumerate(zip(lateral, zweights)):
+		ndi.correlate1d(lat.reshape(shape), zw, -1, result[k], mode, cval, 0)
+	return result
 #
 #
 def kroon3( input, axis=-1, output=None, mode="reflect", cval=0.0):
@@ -586,9 +764,11 @@ def kroon3( input, axis=-1, output=None, mode="reflect", cval=0.0):
 			derivative. Default is the last axis.
 		output: optional, an array to store the derivative filter output.
 			Should be the same shape as the input array.
-		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
-			specifies how the array boundaries are filtered. Default is
-			'reflect'.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap', 'valid'}
+			optional, specifies how the array boundaries are filtered.
+			'valid' only computes the traces free of boundary effects, so
+			the lateral (all but the last) axes of the output are 2 shorter,
+			and reflects along the last axis. Default is 'reflect'.
 		cval: optional, specified value to pad input array if mode is 
 			'constant'. Default is 0.0.
 			
@@ -597,12 +777,17 @@ def kroon3( input, axis=-1, output=None, mode="reflect", cval=0.0):
 		dimension indices 1:-1 will be free of boundary effects. 
 	"""
 	input = np.asarray(input)
-	axis = ndi._ni_support._check_axis(axis, input.ndim)
+	axis = _checkAxis(axis, input.ndim)
+	deriv, smooth = derivative_filters['kroon']
+	if mode == 'valid':
+		weights = [smooth] * input.ndim
+		weights[axis] = deriv
+		return _separableValid(input, weights, output)
 	output = getOutput( output, input)
-	ndi.correlate1d(input, [-0.5, 0, 0.5], axis, output, mode, cval, 0)
+	ndi.correlate1d(input, deriv, axis, output, mode, cval, 0)
 	axes = [ii for ii in range(input.ndim) if ii != axis]
 	for ii in axes:
-		ndi.correlate1d(output, [0.178947,0.642105,0.178947], ii, output, mode, cval, 0,)
+		ndi.correlate1d(output, smooth, ii, output, mode, cval, 0,)
 	return output
 
 # Farid 5 point second derivative filter
@@ -618,7 +803,11 @@ def farid2_( input, axis=-1, output=None, mode="reflect", cval=0.0):
 	%(cval)s
 	"""
 	input = np.asarray(input)
-	axis = ndi._ni_support._check_axis(axis, input.ndim)
+	axis = _checkAxis(axis, input.ndim)
+	if mode == 'valid':
+		weights = [[0.030320, 0.249724, 0.439911, 0.249724, 0.030320]] * input.ndim
+		weights[axis] = [0.232905, 0.002668, -0.471147, 0.002668, 0.232905]
+		return _separableValid(input, weights, output)
 	output = getOutput(output, input)
 	ndi.correlate1d(input, [0.232905, 0.002668, -0.471147, 0.002668, 0.232905], axis, output, mode, cval, 0)
 	axes = [ii for ii in range(input.ndim) if ii != axis]
@@ -639,14 +828,214 @@ def farid5( input, axis=-1, output=None, mode="reflect", cval=0.0):
 	%(cval)s
 	"""
 	input = np.asarray(input)
-	axis = ndi._ni_support._check_axis(axis, input.ndim)
+	axis = _checkAxis(axis, input.ndim)
+	deriv, smooth = derivative_filters['farid5']
+	if mode == 'valid':
+		weights = [smooth] * input.ndim
+		weights[axis] = deriv
+		return _separableValid(input, weights, output)
 	output = getOutput(output, input)
-	ndi.correlate1d(input, [-0.109604, -0.276691,  0.000000, 0.276691, 0.109604], axis, output, mode, cval, 0)
+	ndi.correlate1d(input, deriv, axis, output, mode, cval, 0)
 	axes = [ii for ii in range(input.ndim) if ii != axis]
 	for ii in axes:
-		ndi.correlate1d(output, [0.037659,  0.249153,  0.426375, 0.249153, 0.037659], ii, output, mode, cval, 0,)
+		ndi.correlate1d(output, smooth, ii, output, mode, cval, 0,)
 	return output
 
+#
+#
+def _contract( input, weights, axis, size ):
+	"""Correlate input with weights along axis keeping only the central size positions."""
+	n = input.shape[axis]
+	nw = len(weights)
+	start = n//2 - size//2 - nw//2
+	if start < 0 or start + size + nw - 1 > n:
+		raise ValueError("%d traces along axis %d is too small for %d output traces with a %d point filter" % (n, axis, size, nw))
+	dtype = np.result_type(input.dtype, np.float64)
+	idx = [slice(None)] * input.ndim
+	result = None
+	for k, w in enumerate(weights):
+		if w == 0:
+			continue
+		idx[axis] = slice(start+k, start+k+size)
+		term = np.multiply(input[tuple(idx)], w, dtype=dtype)
+		if result is None:
+			result = term
+		else:
+			result += term
+	return result
+#
+#
+def _lateralSizes( size, lateral=2 ):
+	"""Return the number of output traces along each lateral axis."""
+	if size is None:
+		return (1,) * lateral
+	elif np.isscalar(size):
+		return (int(size),) * lateral
+	return tuple(size)
+#
+#
+def centre_derivative( input, axis=-1, operator='kroon', size=None, output=None, mode="reflect", cval=0.0):
+	"""First derivative along an axis at the centre trace or a central sub-block only.
+
+	The input is assumed to be a NxMxNS (or NxNS) block of traces. Rather than
+	filtering the full block and discarding all but the centre, the lateral
+	axes are contracted with the derivative or smoothing weights first, so
+	only the requested traces are computed, and the Z filter is applied to
+	what is left. Results match the boundary free part of the full block
+	kroon3, scharr3 and farid5 filters.
+
+	Args:
+		input: the NxMxNS (or NxNS) block of traces.
+		axis: optional, specifies the array axis to calculate the
+			derivative. Default is the last (Z) axis.
+		operator: optional, {'kroon', 'scharr', 'farid5'} the derivative
+			filter, see derivative_filters. Default is 'kroon'.
+		size: optional, number of output traces along each lateral axis as an
+			int or tuple. Default is None for the centre trace only.
+		output: optional, an array to store the derivative filter output.
+			Should be the same shape as the returned array.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
+			specifies how the Z boundaries are filtered. Default is
+			'reflect'.
+		cval: optional, specified value to pad input array if mode is
+			'constant'. Default is 0.0.
+
+	Returns:
+		for size==None: derivative filtered 1D array with same length as last
+						dimension of the input.
+		otherwise: derivative filtered array of shape size + (NS,).
+	"""
+	input = np.asarray(input)
+	axis = _checkAxis(axis, input.ndim)
+	deriv, smooth = derivative_filters[operator]
+	lateral = input.ndim - 1
+	sizes = _lateralSizes(size, lateral)
+	result = input
+	for ax in range(lateral):
+		result = _contract(result, deriv if ax==axis else smooth, ax, sizes[ax])
+	if size is None:
+		result = result.reshape(input.shape[-1])
+	output = getOutput(output, result)
+	ndi.correlate1d(result, deriv if axis==input.ndim-1 else smooth, -1, output, mode, cval, 0)
+	return output
+
+#
+#
+def gradient3( input, operator='kroon', output=None, full=True, size=None, mode="reflect", cval=0.0):
+	"""First derivatives along all 3 axes with shared smoothing passes.
+
+	Returns the same derivatives as calling kroon3, scharr3 or farid5 once
+	per axis but the smoothing along each axis is shared between two of
+	the derivatives, so a full block needs 8 filter passes rather than 9.
+	When full is False the lateral axes are contracted first as in
+	centre_derivative and only the centre trace or a central sub-block is
+	computed.
+
+	Args:
+		input: the NxMxNS block of traces.
+		operator: optional, {'kroon', 'scharr', 'farid5'} the derivative
+			filter, see derivative_filters. Default is 'kroon'.
+		output: optional, a sequence of 3 arrays to store the x, y and z
+			derivatives. Each should be the same shape as the returned
+			arrays.
+		full: optional, boolean determining if derivatives are calculated for
+			all traces (True, the default) or only the centre trace or a
+			central sub-block (False)
+		size: optional, for full==False the number of output traces along
+			each lateral axis as an int or tuple. Default is None for the
+			centre trace only.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
+			specifies how the array boundaries are filtered. Default is
+			'reflect'. For full==False only applies along the Z axis.
+		cval: optional, specified value to pad input array if mode is
+			'constant'. Default is 0.0.
+
+	Returns:
+		tuple of the x, y and z derivative arrays.
+		for full==True: arrays the same shape as the input
+		for full==False and size==None: 1D arrays with the same length as the
+						last dimension of the input
+		for full==False: arrays of shape size + (NS,).
+	"""
+	input = np.asarray(input)
+	if input.ndim != 3:
+		raise ValueError("gradient3 requires a 3D input block")
+	deriv, smooth = derivative_filters[operator]
+	if output is None:
+		output = (None, None, None)
+	if full:
+		gx, gy, gz = [getOutput(out, input) for out in output]
+		tmp1 = np.empty_like(gx)
+		tmp2 = np.empty_like(gx)
+		ndi.correlate1d(input, smooth, 2, tmp1, mode, cval, 0)
+		ndi.correlate1d(tmp1, smooth, 1, tmp2, mode, cval, 0)
+		ndi.correlate1d(tmp2, deriv, 0, gx, mode, cval, 0)
+		ndi.correlate1d(tmp1, deriv, 1, tmp2, mode, cval, 0)
+		ndi.correlate1d(tmp2, smooth, 0, gy, mode, cval, 0)
+		ndi.correlate1d(input, smooth, 0, tmp1, mode, cval, 0)
+		ndi.correlate1d(tmp1, smooth, 1, tmp2, mode, cval, 0)
+		ndi.correlate1d(tmp2, deriv, 2, gz, mode, cval, 0)
+		return gx, gy, gz
+	sizes = _lateralSizes(size)
+	sx = _contract(input, smooth, 0, sizes[0])
+	dx = _contract(input, deriv, 0, sizes[0])
+	lateral = [	_contract(dx, smooth, 1, sizes[1]),
+				_contract(sx, deriv, 1, sizes[1]),
+				_contract(sx, smooth, 1, sizes[1])]
+	result = []
+	for lat, out, weights in zip(lateral, output, (smooth, smooth, deriv)):
+		if size is None:
+			lat = lat.reshape(input.shape[-1])
+		out = getOutput(out, lat)
+		ndi.correlate1d(lat, weights, -1, out, mode, cval, 0)
+		result.append(out)
+	return tuple(result)
+
+#
+#
+def wavenumber3( ansig, operator='kroon', full=True, size=None, mode="reflect", cval=0.0):
+	"""Instantaneous wavenumber vector of a block of analytic traces.
+
+	Calculates p = sr * d(si) - si * d(sr) along each axis, where sr and si
+	are the real and imaginary parts of the analytic signal, ie the
+	imaginary part of conj(s) * d(s). The complex block is filtered in a
+	single set of gradient3 passes and the products are formed in place.
+
+	Args:
+		ansig: the NxMxNS block of complex analytic traces.
+		operator: optional, {'kroon', 'scharr', 'farid5'} the derivative
+			filter, see derivative_filters. Default is 'kroon'.
+		full: optional, boolean determining if the wavenumber is calculated
+			for all traces (True, the default) or only the centre trace or
+			a central sub-block (False)
+		size: optional, for full==False the number of output traces along
+			each lateral axis as an int or tuple. Default is None for the
+			centre trace only.
+		mode: {'reflect', 'constant', 'nearest', 'mirror', 'wrap'} optional,
+			specifies how the array boundaries are filtered. Default is
+			'reflect'.
+		cval: optional, specified value to pad input array if mode is
+			'constant'. Default is 0.0.
+
+	Returns:
+		tuple of the x, y and z wavenumber arrays, shaped as for gradient3.
+	"""
+	ansig = np.asarray(ansig)
+	grads = gradient3(ansig, operator, None, full, size, mode, cval)
+	if full:
+		s = ansig
+	else:
+		idx = tuple(slice(n//2 - sz//2, n//2 - sz//2 + sz) for n, sz in zip(ansig.shape[:2], _lateralSizes(size)))
+		s = ansig[idx].reshape(grads[0].shape)
+	tmp = np.empty(s.shape)
+	result = []
+	for g in grads:
+		p = np.multiply(s.real, g.imag)
+		np.multiply(s.imag, g.real, out=tmp)
+		p -= tmp
+		result.append(p)
+	return tuple(result)
+
 # Gaussian filter kernel
 #
 def getGaussian( xs, ys, zs ):
@@ -656,46 +1045,390 @@ def getGaussian( xs, ys, zs ):
 	tmp[xs//2, ys//2, zs//2] = 1.0
 	return ndi.gaussian_filter(tmp, (xs/6,ys/6,zs/6), mode='constant')
 
+def getGaussianWeights( xs, ys, zs ):
+	"""Return the 1D weights along each axis of the getGaussian kernel of the specified size
+
+	The gaussian kernel is separable, the outer product of the three weight
+	arrays is getGaussian(xs, ys, zs).
+	"""
+	weights = []
+	for n in (xs, ys, zs):
+		tmp = np.zeros(n)
+		tmp[n//2] = 1.0
+		weights.append(ndi.gaussian_filter1d(tmp, n/6, mode='constant'))
+	return weights
+
+#
+# Convolution of a separable 3D filter with stacked 3D data - only calculates the output for the centre trace
+#
+def separable_sconvolve( input, weights, output=None ):
+	"""Centre trace convolution of a stack of blocks with a separable 3D filter.
+
+	Gives the same result as sconvolve for each block with the filter given
+	by the outer product of the weights, eg getGaussianWeights, but the
+	lateral axes are contracted first and a 1D Z filter is applied to what
+	is left, so the cost per sample is Xf*Yf+Zf rather than Xf*Yf*Zf. As for
+	sconvolve the first and last Zf//2 samples are zero.
+
+	Args:
+		input: a (..., X, Y, Z) array of blocks, eg the six structure tensor
+			component products stacked into a 6xXxYxZ array.
+		weights: the (wx, wy, wz) 1D filter weights along each axis.
+		output: optional, an array to store the result. Should be the same
+			shape as the returned array.
+
+	Returns:
+		the (..., Z) centre trace convolution of each block.
+	"""
+	wx, wy, wz = [np.asarray(w) for w in weights]
+	tmp = _contract(input, wx[::-1], -3, 1)
+	tmp = _contract(tmp, wy[::-1], -2, 1)[..., 0, 0, :]
+	Z = tmp.shape[-1]
+	Zf = len(wz)
+	Zf2 = Zf//2
+	result = getOutput(output, tmp)
+	result[...] = 0.0
+	nz = Z - 2*Zf2
+	if nz > 0:
+		valid = result[..., Zf2:Zf2+nz]
+		for kk in range(Zf):
+			valid += wz[Zf-1-kk] * tmp[..., kk:kk+nz]
+	return result
+
 
 # Convolution of 3D filter with 3D data - only calulates the output for the centre trace
-# Numba JIT used to accelerate the calculations
+# Numba JIT used to accelerate the calculations, compiled lazily for each input dtype
 #
-@jit(double(double[:,:,:], double[:,:,:]))
-def sconvolve(arr, filt):
+@jit(nopython=True, cache=True)
+def _sconvolveRange(arr, filt, result, start, stop):
 	X,Y,Z = arr.shape
 	Xf,Yf,Zf = filt.shape
-	X2 = X//2
-	Y2 = Y//2
-	Xf2 = Xf//2
-	Yf2 = Yf//2
-	Zf2 = Zf//2
-	result = np.zeros(Z)
-	for i in range(Zf2, Z-Zf2):
-		num = 0.0
-		for ii in range(Xf):
-			for jj in range(Yf):
-				for kk in range(Zf):
-					num += (filt[Xf-1-ii, Yf-1-jj, Zf-1-kk] * arr[X2-Xf2+ii, Y2-Yf2+jj, i-Zf2+kk])
-		result[i] = num
-	return result
+	X0 = X//2 - Xf//2
+	Y0 = Y//2 - Yf//2
+	Z0 = start - Zf//2
+	n = stop - start
+	acc = np.zeros(n)
+	for ii in range(Xf):
+		for jj in range(Yf):
+			trc = arr[X0+ii, Y0+jj]
+			for kk in range(Zf):
+				w = filt[Xf-1-ii, Yf-1-jj, Zf-1-kk]
+				for i in range(n):
+					acc[i] += w * trc[Z0+kk+i]
+	for i in range(n):
+		result[start+i] = acc[i]
+
+@jit(nopython=True, cache=True)
+def _sconvolve(arr, filt, result):
+	Z = arr.shape[2]
+	Zf2 = filt.shape[2]//2
+	result[:] = 0.0
+	if Z > 2*Zf2:
+		_sconvolveRange(arr, filt, result, Zf2, Z-Zf2)
+
+@jit(nopython=True, cache=True, parallel=True)
+def _psconvolve(arr, filt, result, chunk):
+	Z = arr.shape[2]
+	Zf2 = filt.shape[2]//2
+	result[:] = 0.0
+	n = Z - 2*Zf2
+	for b in prange((n + chunk - 1)//chunk):
+		_sconvolveRange(arr, filt, result, Zf2+b*chunk, Zf2+min((b+1)*chunk, n))
+
+def sconvolve(arr, filt, output=None, parallel=False, chunk=256):
+	"""Convolution of a 3D filter with a 3D block, for the centre trace only.
+
+	The first and last Zf//2 samples of the result are zero. Float32 and
+	float64 blocks are used as is, the sum is accumulated in float64.
+
+	Args:
+		arr: the XxYxZ block of traces.
+		filt: the XfxYfxZf filter.
+		output: optional, a Z length array to store the result. Default is a
+			new float64 array.
+		parallel: optional, split the Z samples into chunks computed on
+			separate threads. Only worthwhile for long traces. Default is
+			False.
+		chunk: optional, number of Z samples per thread when parallel.
+
+	Returns:
+		the Z length convolution output for the centre trace.
+	"""
+	if output is None:
+		output = np.empty(arr.shape[2])
+	else:
+		output = getOutput(output, arr, (arr.shape[2],))
+	if parallel:
+		_psconvolve(arr, filt, output, chunk)
+	else:
+		_sconvolve(arr, filt, output)
+	return output
+
+#
+# Sorted eigenvalues and dominant eigenvector of 3x3 symmetric matrices
+# Numba JIT used to accelerate the calculations
+#
+@jit(nopython=True, cache=True)
+def _eigen3(txx, tyy, tzz, txy, txz, tyz, evals, evec):
+	vectors = evec.shape[1] > 0
+	for i in range(txx.shape[0]):
+		a11 = txx[i]
+		a22 = tyy[i]
+		a33 = tzz[i]
+		a12 = txy[i]
+		a13 = txz[i]
+		a23 = tyz[i]
+		if not (math.isfinite(a11) and math.isfinite(a22) and math.isfinite(a33) and
+				math.isfinite(a12) and math.isfinite(a13) and math.isfinite(a23)):
+#
+#	Non-finite components give NaN eigenvalues and vector, as np.linalg.eigh does
+			for k in range(3):
+				evals[k,i] = np.nan
+				if vectors:
+					evec[k,i] = np.nan
+			continue
+		p1 = a12*a12 + a13*a13 + a23*a23
+		if p1 == 0.0:
+			evals[0,i] = max(a11, a22, a33)
+			evals[2,i] = min(a11, a22, a33)
+			evals[1,i] = a11 + a22 + a33 - evals[0,i] - evals[2,i]
+			if vectors:
+				evec[0,i] = 0.0
+				evec[1,i] = 0.0
+				evec[2,i] = 0.0
+				if a33 >= a22 and a33 >= a11:
+					evec[2,i] = 1.0
+				elif a22 >= a11:
+					evec[1,i] = 1.0
+				else:
+					evec[0,i] = 1.0
+			continue
+#
+#	Largest eigenvalue by the trigonometric method
+		q = (a11 + a22 + a33)/3.0
+		b11 = a11 - q
+		b22 = a22 - q
+		b33 = a33 - q
+		p = math.sqrt((b11*b11 + b22*b22 + b33*b33 + 2.0*p1)/6.0)
+		r = (b11*(b22*b33 - a23*a23) - a12*(a12*b33 - a23*a13) + a13*(a12*a23 - b22*a13))/(2.0*p*p*p)
+		r = min(max(r, -1.0), 1.0)
+		e1 = q + 2.0*p*math.cos(math.acos(r)/3.0)
+#
+#	Its eigenvector is the largest cross product of the rows of T - e1*I
+		r0 = (a11 - e1, a12, a13)
+		r1 = (a12, a22 - e1, a23)
+		r2 = (a13, a23, a33 - e1)
+		best = 0.0
+		vx = 0.0
+		vy = 0.0
+		vz = 0.0
+		for ra, rb in ((r0, r1), (r0, r2), (r1, r2)):
+			cx = ra[1]*rb[2] - ra[2]*rb[1]
+			cy = ra[2]*rb[0] - ra[0]*rb[2]
+			cz = ra[0]*rb[1] - ra[1]*rb[0]
+			norm = cx*cx + cy*cy + cz*cz
+			if norm > best:
+				best = norm
+				vx = cx
+				vy = cy
+				vz = cz
+		scale = max(abs(e1), 3.0*p)
+		if best <= 1.0e-20 * scale*scale*scale*scale:
+#
+#	Nearly equal largest eigenvalues, fall back to LAPACK
+			w, v = np.linalg.eigh(np.array([[a11, a12, a13], [a12, a22, a23], [a13, a23, a33]]))
+			evals[0,i] = w[2]
+			evals[1,i] = w[1]
+			evals[2,i] = w[0]
+			if vectors:
+				evec[0,i] = v[0,2]
+				evec[1,i] = v[1,2]
+				evec[2,i] = v[2,2]
+			continue
+		norm = math.sqrt(best)
+		vx /= norm
+		vy /= norm
+		vz /= norm
+#
+#	Remaining eigenvalues from the 2x2 matrix in the plane normal to the
+#	eigenvector, more accurate than the trigonometric roots when they are
+#	small compared to e1
+		if abs(vx) <= abs(vy) and abs(vx) <= abs(vz):
+			norm = math.sqrt(vy*vy + vz*vz)
+			ux, uy, uz = 0.0, vz/norm, -vy/norm
+		elif abs(vy) <= abs(vz):
+			norm = math.sqrt(vx*vx + vz*vz)
+			ux, uy, uz = -vz/norm, 0.0, vx/norm
+		else:
+			norm = math.sqrt(vx*vx + vy*vy)
+			ux, uy, uz = vy/norm, -vx/norm, 0.0
+		wx = vy*uz - vz*uy
+		wy = vz*ux - vx*uz
+		wz = vx*uy - vy*ux
+		tux = a11*ux + a12*uy + a13*uz
+		tuy = a12*ux + a22*uy + a23*uz
+		tuz = a13*ux + a23*uy + a33*uz
+		twx = a11*wx + a12*wy + a13*wz
+		twy = a12*wx + a22*wy + a23*wz
+		twz = a13*wx + a23*wy + a33*wz
+		c11 = ux*tux + uy*tuy + uz*tuz
+		c12 = ux*twx + uy*twy + uz*twz
+		c22 = wx*twx + wy*twy + wz*twz
+		m = 0.5*(c11 + c22)
+		d = math.sqrt(0.25*(c11 - c22)*(c11 - c22) + c12*c12)
+		if m >= 0.0:
+			e2 = m + d
+			e3 = (c11*c22 - c12*c12)/e2 if e2 != 0.0 else 0.0
+		else:
+			e3 = m - d
+			e2 = (c11*c22 - c12*c12)/e3
+		evals[0,i] = e1
+		evals[1,i] = e2
+		evals[2,i] = e3
+		if vectors:
+			evec[0,i] = vx
+			evec[1,i] = vy
+			evec[2,i] = vz
+
+def eigen3( txx, tyy, tzz, txy, txz, tyz, vectors=True ):
+	"""Eigenvalues and dominant eigenvector of 3x3 symmetric matrices.
+
+	The largest eigenvalue of each matrix is found in closed form with the
+	trigonometric method and its eigenvector as the largest cross product
+	of the rows of T - e1*I. The other two eigenvalues come from the 2x2
+	matrix in the plane normal to that eigenvector. LAPACK is used as a
+	fallback when the two largest eigenvalues are nearly equal. The
+	matrices are given by their six unique components, eg the smoothed
+	structure tensor components, so no stacked (N,3,3) array is needed.
+	Matrices with a NaN or infinite component give NaN eigenvalues and
+	eigenvector.
+
+	Args:
+		txx, tyy, tzz: arrays with the diagonal components.
+		txy, txz, tyz: arrays with the off diagonal components.
+		vectors: optional, boolean determining if the dominant eigenvector
+			is returned. Default is True.
+
+	Returns:
+		evals: (3,N) array of eigenvalues sorted from largest to smallest.
+		evec: for vectors==True, (3,N) array with the unit eigenvector of
+			the largest eigenvalue.
+	"""
+	comps = [np.ascontiguousarray(c, dtype=np.float64).ravel() for c in (txx, tyy, tzz, txy, txz, tyz)]
+	n = comps[0].shape[0]
+	evals = np.empty((3, n))
+	evec = np.empty((3, n if vectors else 0))
+	_eigen3(*comps, evals, evec)
+	if vectors:
+		return evals, evec
+	return evals
+
+#
+#	Vector filters available to vecFilter, compiled in _vecFilter
+vector_filters = {'mean': 0, 'l1': 1, 'l2': 2, 'x3': 3}
+
+@jit(nopython=True, cache=True)
+def _vecDist(norm, ax, ay, az, bx, by, bz):
+	dx = abs(bx-ax)
+	dy = abs(by-ay)
+	dz = abs(bz-az)
+	if norm == 1:
+		return dx + dy + dz
+	elif norm == 2:
+		return dx*dx + dy*dy + dz*dz
+	return max(dx,dy,dz) + dx + dy + dz
+
+@jit(nopython=True, cache=True)
+def _vecAddSlice(indata, k, window, norm, pts, rowsum):
+	_, X, Y, _ = indata.shape
+	n = X*Y
+	sk = k % window
+	for p in range(n):
+		for c in range(3):
+			pts[sk,c,p] = indata[c, p//Y, p%Y, k]
+	if norm == 0:
+		return
+	rowsum[sk,:,:] = 0.0
+	rowsum[:,sk,:] = 0.0
+	for t in range(max(0, k-window+1), k+1):
+		st = t % window
+		for p in range(n):
+			q0 = p+1 if st == sk else 0
+			for q in range(q0, n):
+				d = _vecDist(norm, pts[sk,0,p], pts[sk,1,p], pts[sk,2,p], pts[st,0,q], pts[st,1,q], pts[st,2,q])
+				rowsum[sk,st,p] += d
+				rowsum[st,sk,q] += d
+
+@jit(nopython=True, cache=True)
+def _vecFilter(indata, window, norm, outdata):
+	_, X, Y, nz = indata.shape
+	n = X*Y
+	hw = window//2
+	window = 2*hw+1
+	pts = np.zeros((window, 3, n))
+	rowsum = np.zeros((window, window, n))
+	for k in range(min(window-1, nz)):
+		_vecAddSlice(indata, k, window, norm, pts, rowsum)
+	for z in range(hw, nz-hw):
+		_vecAddSlice(indata, z+hw, window, norm, pts, rowsum)
+		if norm == 0:
+			sx = 0.0
+			sy = 0.0
+			sz = 0.0
+			for p in range(n):
+				for dz in range(window):
+					s = (z-hw+dz) % window
+					sx += pts[s,0,p]
+					sy += pts[s,1,p]
+					sz += pts[s,2,p]
+			outdata[0,z] = sx/(n*window)
+			outdata[1,z] = sy/(n*window)
+			outdata[2,z] = sz/(n*window)
+			continue
+		best = np.inf
+		bs = 0
+		bp = 0
+		for p in range(n):
+			for dz in range(window):
+				s = (z-hw+dz) % window
+				tot = 0.0
+				for t in range(window):
+					tot += rowsum[s,t,p]
+				if tot < best:
+					best = tot
+					bs = s
+					bp = p
+		for c in range(3):
+			outdata[c,z] = pts[bs,c,bp]
 
 #
 #	General vector filtering function
 #	indata contains the vector components
-#	window is the window length in the Z direction the size in the X and Y directions is determined from the data
-#	filtFunc is a Python function that takes an array of vector coordinates and applies the filter
+#	window is the window length in the Z direction the size in the X and Y directions is determined from the data,
+#	an even window covers window+1 samples centred on the output sample
+#	filtFunc is the name of a compiled filter in vector_filters ('mean', 'l1', 'l2' or 'x3'), one of vecmean,
+#	vmf_l1, vmf_l2 or vmf_x3, or any Python function that takes an array of vector coordinates and applies the filter
 #	outdata is an array that holds the filtered output vectors
+#
+#	The compiled filters run the whole trace in numba and, for the vector medians, only compute the
+#	distances to the Z slice entering the window as it slides down the trace
 def vecFilter(indata, window, filtFunc, outdata ):
-    nz = indata.shape[3]
-    half_win = window//2
-    outdata.fill(0.0) 
-    for z in range(half_win,nz-half_win):
-        pts = indata[:,:,:,z-half_win:z+half_win+1].reshape(3,-1)
-        outdata[:,z] = filtFunc(pts)
-    for z in range(half_win):
-        outdata[:,z] = outdata[:,half_win]
-    for z in range(nz-half_win, nz):
-        outdata[:,z] = outdata[:,nz-half_win-1]
+	nz = indata.shape[3]
+	half_win = window//2
+	outdata.fill(0.0)
+	filtFunc = getattr(filtFunc, 'py_func', filtFunc)
+	names = {vecmean: 'mean', vmf_l1: 'l1', vmf_l2: 'l2', vmf_x3: 'x3'}
+	if filtFunc in names or filtFunc in vector_filters:
+		_vecFilter(indata, window, vector_filters[names.get(filtFunc, filtFunc)], outdata)
+	else:
+		for z in range(half_win,nz-half_win):
+			pts = indata[:,:,:,z-half_win:z+half_win+1].reshape(3,-1)
+			outdata[:,z] = filtFunc(pts)
+	if nz > 2*half_win:
+		for z in range(half_win):
+			outdata[:,z] = outdata[:,half_win]
+		for z in range(nz-half_win, nz):
+			outdata[:,z] = outdata[:,nz-half_win-1]
 
 #
 #	Calculate the mean vector of the contents of the pts array 
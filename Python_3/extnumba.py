@@ -11,7 +11,7 @@
 # Homepage:		http://waynegm.github.io/OpendTect-Plugin-Docs/External_Attributes/ExternalAttributes/
 #
 import numpy as np
-from numba import jit
+from numba import jit, prange
 import math
 
 #
@@ -61,27 +61,357 @@ def winSum( inp, winlen, outp):
 		outp[i] = sum
 		
 #
-# Moving window sum of squares of a 1D array
-@jit()
-def winSSQ( inp, winlen, outp):
-	inpsq = np.square(inp)
+# Neumaier compensated addition of x to sum, returns the new sum and compensation
+@jit(nopython=True, cache=True)
+def _neumaier( sum, comp, x):
+	t = sum + x
+	if abs(sum) >= abs(x):
+		comp += (sum - t) + x
+	else:
+		comp += (x - t) + sum
+	return t, comp
+
+#
+# Moving window root sum of squares of a 1D array
+# The running sum is updated as the window slides so its error grows with the trace length. With
+# kahan=True the updates use Neumaier compensated summation and with resync=n>0 the window sum is
+# recomputed from scratch every n samples. Negative sums from cancellation are clipped to zero.
+@jit(nopython=True, cache=True)
+def winSSQ( inp, winlen, outp, kahan=False, resync=0):
 	ns = inp.shape[0]
 	hw = winlen//2
-	hwp1 = hw+1
 	sum = 0.0
-	for i in range(hw):
-		sum += inpsq[i]
-		
-	for i in range(hwp1):
-		sum += inpsq[i+hw]
-		outp[i] = math.sqrt(sum)
-		
-	for i in range(hw+1,ns-hw):
-		sum += inpsq[i+hw] - inpsq[i-hw-1]
-		outp[i] = math.sqrt(sum)
-		
-	for i in range(ns-hw,ns):
-		sum -= inpsq[i-hw-1]
-		outp[i] = math.sqrt(sum)
-	
-	
+	comp = 0.0
+	for i in range(min(hw, ns)):
+		v = float(inp[i])
+		if kahan:
+			sum, comp = _neumaier(sum, comp, v*v)
+		else:
+			sum += v*v
+
+	for i in range(ns):
+		if resync > 0 and i % resync == 0:
+			sum = 0.0
+			comp = 0.0
+			for k in range(max(i-hw, 0), min(i+hw+1, ns)):
+				v = float(inp[k])
+				sum += v*v
+		elif kahan:
+			if i+hw < ns:
+				v = float(inp[i+hw])
+				sum, comp = _neumaier(sum, comp, v*v)
+			if i-hw-1 >= 0:
+				v = float(inp[i-hw-1])
+				sum, comp = _neumaier(sum, comp, -v*v)
+		else:
+			add = 0.0
+			if i+hw < ns:
+				v = float(inp[i+hw])
+				add = v*v
+			if i-hw-1 >= 0:
+				v = float(inp[i-hw-1])
+				add -= v*v
+			sum += add
+		outp[i] = math.sqrt(max(sum + comp, 0.0))
+
+#
+# Moving window average along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMean2( inp, winlen, outp):
+	for i in prange(inp.shape[0]):
+		winMean(inp[i], winlen, outp[i])
+
+#
+# Moving window average along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMean3( inp, winlen, outp):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winMean(inp[k//ny, k%ny], winlen, outp[k//ny, k%ny])
+
+#
+# Moving window sum along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winSum2( inp, winlen, outp):
+	for i in prange(inp.shape[0]):
+		winSum(inp[i], winlen, outp[i])
+
+#
+# Moving window sum along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winSum3( inp, winlen, outp):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winSum(inp[k//ny, k%ny], winlen, outp[k//ny, k%ny])
+
+#
+# Moving window sum of squares along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winSSQ2( inp, winlen, outp, kahan=False, resync=0):
+	for i in prange(inp.shape[0]):
+		winSSQ(inp[i], winlen, outp[i], kahan, resync)
+
+#
+# Moving window sum of squares along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winSSQ3( inp, winlen, outp, kahan=False, resync=0):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winSSQ(inp[k//ny, k%ny], winlen, outp[k//ny, k%ny], kahan, resync)
+
+#
+# Moving window minimum and maximum of a 1D array using monotonic deques, O(n) for any window length
+# Samples within winlen//2 of either end take the value of the nearest full window, as for
+# np.pad(..., 'edge') of the full window results. outmin or outmax are skipped when domin or domax is False
+@jit(nopython=True, cache=True)
+def _winMinMax( inp, winlen, outmin, outmax, domin, domax):
+	ns = inp.shape[0]
+	if ns == 0:
+		return
+	hw = winlen//2
+	win = min(winlen, ns)
+	last = ns - win
+	qmin = np.empty(ns, dtype=np.int64)
+	qmax = np.empty(ns, dtype=np.int64)
+	hmin = tmin = 0
+	hmax = tmax = 0
+	for j in range(ns):
+		if domin:
+			while tmin > hmin and inp[qmin[tmin-1]] >= inp[j]:
+				tmin -= 1
+			qmin[tmin] = j
+			tmin += 1
+		if domax:
+			while tmax > hmax and inp[qmax[tmax-1]] <= inp[j]:
+				tmax -= 1
+			qmax[tmax] = j
+			tmax += 1
+		k = j - win + 1
+		if k < 0:
+			continue
+		if domin:
+			while qmin[hmin] < k:
+				hmin += 1
+		if domax:
+			while qmax[hmax] < k:
+				hmax += 1
+		lo = k + hw if k > 0 else 0
+		hi = k + hw + 1 if k < last else ns
+		for i in range(lo, min(hi, ns)):
+			if domin:
+				outmin[i] = inp[qmin[hmin]]
+			if domax:
+				outmax[i] = inp[qmax[hmax]]
+
+#
+# Moving window minimum of a 1D array
+@jit(nopython=True, cache=True)
+def winMin( inp, winlen, outp):
+	_winMinMax(inp, winlen, outp, outp, True, False)
+
+#
+# Moving window maximum of a 1D array
+@jit(nopython=True, cache=True)
+def winMax( inp, winlen, outp):
+	_winMinMax(inp, winlen, outp, outp, False, True)
+
+#
+# Moving window minimum and maximum of a 1D array in one pass, eg for dynamic range normalisation
+@jit(nopython=True, cache=True)
+def winMinMax( inp, winlen, outmin, outmax):
+	_winMinMax(inp, winlen, outmin, outmax, True, True)
+
+#
+# Moving window minimum along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMin2( inp, winlen, outp):
+	for i in prange(inp.shape[0]):
+		winMin(inp[i], winlen, outp[i])
+
+#
+# Moving window minimum along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMin3( inp, winlen, outp):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winMin(inp[k//ny, k%ny], winlen, outp[k//ny, k%ny])
+
+#
+# Moving window maximum along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMax2( inp, winlen, outp):
+	for i in prange(inp.shape[0]):
+		winMax(inp[i], winlen, outp[i])
+
+#
+# Moving window maximum along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMax3( inp, winlen, outp):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winMax(inp[k//ny, k%ny], winlen, outp[k//ny, k%ny])
+
+#
+# Moving window minimum and maximum along the last axis of each trace of a 2D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMinMax2( inp, winlen, outmin, outmax):
+	for i in prange(inp.shape[0]):
+		winMinMax(inp[i], winlen, outmin[i], outmax[i])
+
+#
+# Moving window minimum and maximum along the last axis of each trace of a 3D array, traces in parallel
+@jit(nopython=True, cache=True, parallel=True)
+def winMinMax3( inp, winlen, outmin, outmax):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winMinMax(inp[k//ny, k%ny], winlen, outmin[k//ny, k%ny], outmax[k//ny, k%ny])
+
+#
+# Insert x into the sorted first n values of win, which has room for n+1
+@jit(nopython=True, cache=True)
+def _sortedInsert( win, n, x):
+	lo = 0
+	hi = n
+	while lo < hi:
+		mid = (lo + hi)//2
+		if win[mid] < x:
+			lo = mid + 1
+		else:
+			hi = mid
+	for k in range(n, lo, -1):
+		win[k] = win[k-1]
+	win[lo] = x
+
+#
+# Remove one value equal to x from the sorted first n values of win
+@jit(nopython=True, cache=True)
+def _sortedRemove( win, n, x):
+	lo = 0
+	hi = n-1
+	while lo < hi:
+		mid = (lo + hi)//2
+		if win[mid] < x:
+			lo = mid + 1
+		else:
+			hi = mid
+	for k in range(lo, n-1):
+		win[k] = win[k+1]
+
+#
+# Moving window statistics of a 1D array in one pass
+# The window is truncated at the ends of the trace as for winMean. Rows of moments are the mean, population
+# variance, RMS, skewness and excess kurtosis from running power sums of the samples less the trace mean.
+# The sums are recomputed from scratch every winlen samples so rounding errors cannot accumulate, this at
+# most doubles the work. Skewness and kurtosis are 0 where the window variance vanishes. Rows of pctout are
+# the percentiles in pcts (0 to 100, linear interpolation as np.percentile) from a sorted copy of the window
+# updated by binary search insertion and removal. Either moments or pctout may have no rows to skip that part.
+@jit(nopython=True, cache=True)
+def winStats( inp, winlen, pcts, moments, pctout):
+	ns = inp.shape[0]
+	if ns == 0:
+		return
+	hw = winlen//2
+	domom = moments.shape[0] > 0
+	npct = pctout.shape[0]
+	shift = 0.0
+	for i in range(ns):
+		shift += inp[i]
+	shift /= ns
+	win = np.empty(min(2*hw+1, ns), dtype=np.float64)
+	n = 0
+	s1 = s2 = s3 = s4 = 0.0
+	for i in range(min(hw, ns)):
+		v = float(inp[i])
+		if npct > 0:
+			_sortedInsert(win, n, v)
+		n += 1
+		d = v - shift
+		s1 += d
+		s2 += d*d
+		s3 += d*d*d
+		s4 += d*d*d*d
+
+	for i in range(ns):
+		if i-hw-1 >= 0:
+			v = float(inp[i-hw-1])
+			if npct > 0:
+				_sortedRemove(win, n, v)
+			n -= 1
+			d = v - shift
+			s1 -= d
+			s2 -= d*d
+			s3 -= d*d*d
+			s4 -= d*d*d*d
+		if i+hw < ns:
+			v = float(inp[i+hw])
+			if npct > 0:
+				_sortedInsert(win, n, v)
+			n += 1
+			d = v - shift
+			s1 += d
+			s2 += d*d
+			s3 += d*d*d
+			s4 += d*d*d*d
+		if domom:
+			if i % winlen == 0:
+				s1 = s2 = s3 = s4 = 0.0
+				for k in range(max(i-hw, 0), min(i+hw+1, ns)):
+					d = float(inp[k]) - shift
+					s1 += d
+					s2 += d*d
+					s3 += d*d*d
+					s4 += d*d*d*d
+			mu = s1/n
+			m2 = s2/n - mu*mu
+			m3 = s3/n - 3.0*mu*s2/n + 2.0*mu*mu*mu
+			m4 = s4/n - 4.0*mu*s3/n + 6.0*mu*mu*s2/n - 3.0*mu*mu*mu*mu
+			moments[0,i] = shift + mu
+			moments[2,i] = math.sqrt(max(s2/n + 2.0*shift*mu + shift*shift, 0.0))
+			if m2 > 1.0e-12*s2/n:
+				moments[1,i] = m2
+				moments[3,i] = m3/(m2*math.sqrt(m2))
+				moments[4,i] = m4/(m2*m2) - 3.0
+			else:
+				moments[1,i] = 0.0
+				moments[3,i] = 0.0
+				moments[4,i] = 0.0
+		for j in range(npct):
+			h = (n-1)*pcts[j]/100.0
+			lo = min(max(int(math.floor(h)), 0), n-1)
+			hi = min(lo+1, n-1)
+			pctout[j,i] = win[lo] + (h-lo)*(win[hi]-win[lo])
+
+#
+# Moving window mean, variance, RMS, skewness and excess kurtosis of a 1D array, moments is (5, len(inp))
+@jit(nopython=True, cache=True)
+def winMoments( inp, winlen, moments):
+	winStats(inp, winlen, np.empty(0), moments, np.empty((0, inp.shape[0])))
+
+#
+# Moving window percentiles of a 1D array, pctout is (len(pcts), len(inp)), pcts from 0 to 100
+@jit(nopython=True, cache=True)
+def winPercentiles( inp, winlen, pcts, pctout):
+	winStats(inp, winlen, pcts, np.empty((0, inp.shape[0])), pctout)
+
+#
+# Moving window median of a 1D array
+@jit(nopython=True, cache=True)
+def winMedian( inp, winlen, outp):
+	winStats(inp, winlen, np.array([50.0]), np.empty((0, inp.shape[0])), outp[np.newaxis, :])
+
+#
+# Moving window statistics along the last axis of each trace of a 2D array, traces in parallel
+# moments is (ntrc, 5, ns) and pctout is (ntrc, len(pcts), ns), either may have no rows
+@jit(nopython=True, cache=True, parallel=True)
+def winStats2( inp, winlen, pcts, moments, pctout):
+	for i in prange(inp.shape[0]):
+		winStats(inp[i], winlen, pcts, moments[i], pctout[i])
+
+#
+# Moving window statistics along the last axis of each trace of a 3D array, traces in parallel
+# moments is (nx, ny, 5, ns) and pctout is (nx, ny, len(pcts), ns), either may have no rows
+@jit(nopython=True, cache=True, parallel=True)
+def winStats3( inp, winlen, pcts, moments, pctout):
+	ny = inp.shape[1]
+	for k in prange(inp.shape[0]*ny):
+		winStats(inp[k//ny, k%ny], winlen, pcts, moments[k//ny, k%ny], pctout[k//ny, k%ny])
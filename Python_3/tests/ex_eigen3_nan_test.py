@@ -0,0 +1,49 @@
+# Test that extlib.eigen3 returns NaN for tensors with a non-finite component
+#
+# Builds a structure tensor from the gradients of the input block, sets one
+# component of the first sample of every trace to NaN and outputs the three
+# eigenvalues and the dip vector. The first sample of every output must be
+# NaN and the job must run to the end with finite values elsewhere, eg
+#   python Tools/synthstream.py -n 100 --stepout=1,1 --outputs=6 | python tests/ex_eigen3_nan_test.py -c '{}'
+#
+import sys,os
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute
+#
+sys.path.insert(0, os.path.join(sys.path[0], '..'))
+import extattrib as xa
+import extlib as xl
+#
+# These are the attribute parameters
+#
+xa.params = {
+	'Inputs': ['Input'],
+	'Output': ['E1', 'E2', 'E3', 'Vx', 'Vy', 'Vz'],
+	'StepOut' : {'Value': [1,1], 'Hidden': True},
+	'Parallel': False
+}
+#
+# Define the compute function
+#
+def doCompute():
+	while True:
+		xa.doInput()
+		gx = xl.scharr3_dx(xa.Input['Input'], full=False)
+		gy = xl.scharr3_dy(xa.Input['Input'], full=False)
+		gz = xl.scharr3_dz(xa.Input['Input'], full=False)
+		gxx = gx*gx
+		gxx[0] = np.nan
+		evals, evec = xl.eigen3(gxx, gy*gy, gz*gz, gx*gy, gx*gz, gy*gz)
+		for i in range(3):
+			xa.Output['E'+str(i+1)] = evals[i]
+			xa.Output['V'+'xyz'[i]] = evec[i]
+		xa.doOutput()
+#
+# Assign the compute function to the attribute
+#
+xa.doCompute = doCompute
+#
+# Do it
+#
+xa.run(sys.argv[1:])
@@ -0,0 +1,41 @@
+# Test that outputs a script does not assign, or only partly writes, are sent as zeros
+#
+# Output_1 is the input, Output_2 is never assigned and only the first half of
+# Output_3 is written. Run with and without Prefetch and Batch, eg
+#   python Tools/synthstream.py -n 100 --stepout=0,0 --outputs=3 | python tests/ex_unassigned_output_test.py -c '{"Prefetch": true}'
+# every sample of Output_2 and the second half of Output_3 must be zero.
+#
+import sys,os
+import numpy as np
+#
+# Import the module with the I/O scaffolding of the External Attribute
+#
+sys.path.insert(0, os.path.join(sys.path[0], '..'))
+import extattrib as xa
+#
+# These are the attribute parameters
+#
+xa.params = {
+	'Inputs': ['Input'],
+	'Output': ['Output_1', 'Output_2', 'Output_3'],
+	'Parallel': False
+}
+#
+# Define the compute function
+#
+def doCompute():
+	while True:
+		xa.doBatchInput()
+		inp = xa.Input['Input'][:,0,0,:]
+		half = inp.shape[-1]//2
+		xa.Output['Output_1'] = inp
+		xa.Output['Output_3'][:,:half] = inp[:,:half]
+		xa.doBatchOutput()
+#
+# Assign the compute function to the attribute
+#
+xa.doCompute = doCompute
+#
+# Do it
+#
+xa.run(sys.argv[1:])